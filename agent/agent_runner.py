@@ -1,138 +1,648 @@
 # agent/agent_runner.py
-import os
-import json
-from typing import Optional
-
-from langchain.agents import initialize_agent, AgentType
-from langchain_ollama import OllamaLLM
-
-# Local tools
-from tools.context_presence_judge import build_context_presence_checker
-from tools.pdf_relevance_checker import (
-    ensure_vectorstore_ready,
-    add_pdf_if_new,
-    retrieve_relevant_context,
-    attach_persistent_cache,
-)
-from tools.web_search_tool import build_advanced_web_search
+import hashlib
+import queue
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+from agent.ingestion import pending_status, describe as describe_job
 
-HASH_CACHE_FILE = "processed_pdfs.json"
+# LangChain, FAISS, the Ollama client and the local tools built on them are imported by
+# init() and the functions that need them, so importing this module stays cheap
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from langchain_ollama import OllamaLLM
+    from tools.ttl_cache import TTLCache
+
+CATALOG_FILE = "documents.sqlite"
+HASH_CACHE_FILE = "processed_pdfs.json"  # legacy hash list, imported into the catalog once
 VECTOR_STORE_DIR = "vector_store"
+ANSWER_CACHE_FILE = "answer_cache.sqlite"
+WEB_SEARCH_CACHE_FILE = "web_search_cache.sqlite"
 
-# ------------------------
-# LLM (deterministic)
-# ------------------------
-llm = OllamaLLM(model="llama3", temperature=0)
+LLM_MODEL = "llama3"
+# Load the chat and embedding models into Ollama in the background at start-up, so the first
+# question does not pay the model load (keep-alive and pooling: tools.ollama_client)
+WARMUP_ON_START = True
+# Bump whenever a prompt or the answer formatting changes so stale cached answers are not served
+PROMPT_VERSION = "3"
 
-# ------------------------
-# Deterministic context checker
-# ------------------------
-check_context_presence, judge_context = build_context_presence_checker(llm)
+# Answer cache lifetimes: PDF answers are deterministic for a given document,
+# web answers depend on live search results and go stale sooner.
+PDF_ANSWER_TTL = 7 * 24 * 3600.0
+WEB_ANSWER_TTL = 6 * 3600.0
 
-# ------------------------
-# Web search tool
-# ------------------------
-web_search_tool = build_advanced_web_search()
+# Per-request limits for the web ReAct loop (overridable per call)
+WEB_AGENT_MAX_ITERATIONS = 5
+WEB_AGENT_TIME_BUDGET = 60.0  # seconds of wall-clock per question
+WEB_AGENT_GRACE = 5.0  # extra seconds before abandoning a call stuck inside one LLM/tool step
+
+# Opt-in speculative web retrieval: while the PDF branch retrieves and starts answering, the
+# question is already searched on the web, so an INSUFFICIENT fallback starts with results in
+# hand. Only the search runs ahead (no agent LLM calls), at most SPECULATIVE_MAX_INFLIGHT at
+# once; when the PDF answer is sufficient the search is cancelled or its results discarded
+# (they still warm the search cache).
+SPECULATIVE_WEB = False
+SPECULATIVE_MAX_INFLIGHT = 4
+SPECULATIVE_WAIT = 5.0  # seconds the web branch waits for an in-flight speculative search
+
+# Stream event kinds yielded by ask_agent_stream as (kind, value) tuples
+STATUS = "status"
+TOKEN = "token"
+RETRACT = "retract"  # value: text at the end of the answer so far that must be removed
+# Internal event telling the cache which branch produced the answer ("pdf" | "web")
+_SOURCE = "source"
 
 # ------------------------
-# Persistent PDF hash cache
+# Singletons, built on first use by init()
 # ------------------------
-def _load_hash_cache() -> set:
-    if os.path.exists(HASH_CACHE_FILE):
-        try:
-            with open(HASH_CACHE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return set(data) if isinstance(data, list) else set()
-        except Exception:
-            return set()
-    return set()
+llm: Optional["OllamaLLM"] = None  # deterministic (temperature=0)
+check_context_presence = judge_context = None
+web_search_tool = None
+_answer_cache: Optional["TTLCache"] = None
+_initialized = False
+_init_lock = threading.Lock()
 
-def _save_hash_cache(cache: set) -> None:
-    try:
-        with open(HASH_CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(sorted(list(cache)), f)
-    except Exception:
-        pass
+_speculation_pool = ThreadPoolExecutor(max_workers=SPECULATIVE_MAX_INFLIGHT, thread_name_prefix="speculative-web")
+_speculation_slots = threading.BoundedSemaphore(SPECULATIVE_MAX_INFLIGHT)
+
+def init() -> None:
+    """
+    Build the LLM, router, web search tool, caches and vector store; later calls return at once.
+    The ask_agent* functions call it themselves, so calling it up front only moves the
+    start-up cost before the first question (app.py does, for the catalog it shows).
+    """
+    global llm, check_context_presence, judge_context, web_search_tool, _answer_cache, _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        from tools.context_presence_judge import build_context_presence_checker
+        from tools.document_catalog import DocumentCatalog
+        from tools.embedding_backends import OLLAMA
+        from tools.ollama_client import chat_llm, warmup_in_background
+        from tools.pdf_relevance_checker import (
+            EMBEDDING_BACKEND,
+            EMBEDDING_MODEL,
+            attach_persistent_cache,
+            ensure_vectorstore_ready,
+        )
+        from tools.ttl_cache import TTLCache
+        from tools.web_search_tool import build_advanced_web_search
+
+        llm = chat_llm(LLM_MODEL, temperature=0)
+        if WARMUP_ON_START:
+            warmup_in_background([LLM_MODEL], [EMBEDDING_MODEL] if EMBEDDING_BACKEND == OLLAMA else [])
+
+        # Local router (rules + hashed n-gram classifier, LLM judge as fallback), trained on first use
+        check_context_presence, judge_context = build_context_presence_checker(llm)
+
+        # Raw search results are shared across questions and users for WEB_SEARCH_TTL
+        web_search_tool = build_advanced_web_search(
+            cache=TTLCache(WEB_SEARCH_CACHE_FILE, max_memory_entries=512, max_disk_entries=20_000, table="web_search")
+        )
 
-_pdf_cache = _load_hash_cache()
-attach_persistent_cache(_pdf_cache, on_flush=_save_hash_cache)
-ensure_vectorstore_ready(VECTOR_STORE_DIR)
+        # Persistent document catalog, answer cache and vector store
+        attach_persistent_cache(DocumentCatalog(CATALOG_FILE, legacy_json=HASH_CACHE_FILE))
+        _answer_cache = TTLCache(ANSWER_CACHE_FILE, max_memory_entries=512, max_disk_entries=50_000)
+        ensure_vectorstore_ready(VECTOR_STORE_DIR)
+        _initialized = True
 
 # ------------------------
 # Helpers
 # ------------------------
-def _answer_from_pdf(llm: OllamaLLM, question: str, context: str) -> str:
-    prompt = (
-        "You are a meticulous assistant. Answer the question **only** using the provided PDF excerpts.\n"
-        "If the PDF does not contain enough information, say: 'INSUFFICIENT'.\n\n"
-        "PDF Context:\n"
-        "----------------\n"
-        f"{context}\n"
+_INSUFFICIENT = "INSUFFICIENT"
+_FINAL_ANSWER = "Final Answer:"
+
+# Static instructions come first and never vary, so Ollama can reuse their cached
+# prompt evaluation from one question to the next
+_PDF_PROMPT_PREFIX = (
+    "You are a meticulous assistant. Answer the question **only** using the provided PDF excerpts.\n"
+    "If the PDF does not contain enough information, say: 'INSUFFICIENT'.\n\n"
+    "PDF Context:\n"
+    "----------------\n"
+)
+
+def _pdf_prompt(question: str, context: str) -> str:
+    return (
+        _PDF_PROMPT_PREFIX
+        + f"{context}\n"
         "----------------\n\n"
         f"Question: {question}\n\n"
         "Answer:"
     )
-    out = llm.invoke(prompt)
+
+def _stream_pdf_answer(llm: "OllamaLLM", question: str, context: str) -> Iterator[str]:
+    for chunk in llm.stream(_pdf_prompt(question, context)):
+        yield chunk if isinstance(chunk, str) else str(chunk)
+
+async def _aanswer_from_pdf(llm: "OllamaLLM", question: str, context: str) -> str:
+    out = await llm.ainvoke(_pdf_prompt(question, context))
     return out if isinstance(out, str) else str(out)
 
-def _answer_via_web(llm: OllamaLLM, question: str) -> str:
-    agent = initialize_agent(
-        tools=[web_search_tool],
-        llm=llm,
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+def _read_answer_head(tokens: Iterator[str]) -> str:
+    """Buffer just enough leading text to tell whether the answer is 'INSUFFICIENT'."""
+    head = ""
+    for token in tokens:
+        head += token
+        probe = head.lstrip().upper()
+        if len(probe) >= len(_INSUFFICIENT) or not _INSUFFICIENT.startswith(probe):
+            break
+    return head
+
+# The ReAct agent (prompt, output parser, tool bindings) is stateless, so it is built once
+# and shared; each request gets a thin executor carrying its own limits.
+_web_agent: Optional["AgentExecutor"] = None
+_web_agent_lock = threading.Lock()
+
+def _get_web_agent() -> "AgentExecutor":
+    global _web_agent
+    if _web_agent is None:
+        with _web_agent_lock:
+            if _web_agent is None:
+                from langchain.agents import initialize_agent, AgentType
+
+                _web_agent = initialize_agent(
+                    tools=[web_search_tool],
+                    llm=llm,
+                    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+                    handle_parsing_errors=True,
+                    verbose=False,
+                )
+    return _web_agent
+
+def _web_executor(max_iterations: Optional[int] = None, time_budget: Optional[float] = None) -> "AgentExecutor":
+    """Cheap per-request executor over the shared agent with an iteration cap and wall-clock budget."""
+    from langchain.agents import AgentExecutor
+
+    shared = _get_web_agent()
+    return AgentExecutor(
+        agent=shared.agent,
+        tools=shared.tools,
         handle_parsing_errors=True,
+        max_iterations=max_iterations or WEB_AGENT_MAX_ITERATIONS,
+        max_execution_time=time_budget or WEB_AGENT_TIME_BUDGET,
         verbose=False,
     )
+
+def _format_web_answer(out) -> str:
+    text = out if isinstance(out, str) else str(out)
+    if not text.strip().lower().startswith("final answer:"):
+        return f"Final Answer: {text.strip()}"
+    return text.strip()
+
+def _hit_agent_limit(output) -> bool:
+    # AgentExecutor's early-stop text when the iteration cap or time budget is exhausted
+    return str(output).startswith("Agent stopped")
+
+def _speculate_web_search(question: str) -> Optional[Future]:
+    """Start searching the web for the question in the background; None when no slot is free."""
+    if not _speculation_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _speculation_pool.submit(web_search_tool.func, question)
+    except Exception:
+        _speculation_slots.release()
+        return None
+    # Runs on completion and on cancellation alike
+    future.add_done_callback(lambda _: _speculation_slots.release())
+    return future
+
+def _usable_results(results: Optional[str]) -> Optional[str]:
+    if not results or results.startswith(("No relevant results", "Search failed")):
+        return None
+    return results
+
+def _prefetched_results(speculative: Optional[Future]) -> Optional[str]:
+    if speculative is None:
+        return None
+    try:
+        return _usable_results(speculative.result(timeout=SPECULATIVE_WAIT))
+    except Exception:
+        return None
+
+async def _aprefetched_results(speculative: Optional[Future]) -> Optional[str]:
+    if speculative is None:
+        return None
     try:
-        out = agent.run(question)
-        text = out if isinstance(out, str) else str(out)
-        if not text.strip().lower().startswith("final answer:"):
-            return f"Final Answer: {text.strip()}"
-        return text.strip()
+        return _usable_results(await asyncio.wait_for(asyncio.wrap_future(speculative), SPECULATIVE_WAIT))
+    except Exception:
+        return None
+
+def _web_input(question: str, prefetched: Optional[str]) -> str:
+    if not prefetched:
+        return question
+    return (
+        f"{question}\n\n"
+        "Web search results already retrieved for this question "
+        "(search again only if they are not enough):\n"
+        f"{prefetched}"
+    )
+
+async def _aanswer_via_web(
+    question: str,
+    max_iterations: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    prefetched: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """Returns (answer, ok); failed answers must not be cached."""
+    budget = time_budget or WEB_AGENT_TIME_BUDGET
+    try:
+        agent = _web_executor(max_iterations, budget)
+        out = await asyncio.wait_for(
+            agent.ainvoke({"input": _web_input(question, prefetched)}), timeout=budget + WEB_AGENT_GRACE
+        )
+        return _format_web_answer(out["output"]), not _hit_agent_limit(out["output"])
+    except asyncio.TimeoutError:
+        return f"Final Answer: (Web search timed out after {budget:.0f}s)", False
     except Exception as e:
-        return f"Final Answer: (Web search error) {str(e)}"
+        return f"Final Answer: (Web search error) {str(e)}", False
+
+@lru_cache(maxsize=None)
+def _web_stream_handler_class():
+    """The callback handler class, defined on first use so LangChain is imported only then."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _WebStreamHandler(BaseCallbackHandler):
+        """
+        Forwards tool calls and the tokens after 'Final Answer:' from the ReAct loop to a queue.
+        Another LLM step after streaming began (the parser rejected that output) puts RETRACT.
+        """
+
+        def __init__(self, events: "queue.Queue"):
+            self.events = events
+            self.buffer = ""
+            self.streaming = False
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            if self.streaming:
+                self.events.put((RETRACT, ""))
+            self.buffer = ""
+            self.streaming = False
+
+        def on_llm_new_token(self, token: str, **kwargs):
+            if self.streaming:
+                self.events.put((TOKEN, token))
+                return
+            self.buffer += token
+            idx = self.buffer.find(_FINAL_ANSWER)
+            if idx != -1:
+                self.streaming = True
+                self.events.put((TOKEN, f"{_FINAL_ANSWER} "))
+                rest = self.buffer[idx + len(_FINAL_ANSWER):].lstrip()
+                if rest:
+                    self.events.put((TOKEN, rest))
+
+        def on_tool_start(self, serialized, input_str: str, **kwargs):
+            self.events.put((STATUS, f"searching web: {input_str}"))
+
+    return _WebStreamHandler
+
+def _stream_web_answer(
+    question: str,
+    max_iterations: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    speculative: Optional[Future] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Run the ReAct agent in a worker thread and relay its events as they happen.
+    Results of a speculative search for the question are handed to the agent up front.
+    Streamed tokens are provisional: when they differ from the executor's output, they are
+    retracted and the output is sent instead.
+    """
+    yield (STATUS, "searching web")
+    prefetched = _prefetched_results(speculative)
+    budget = time_budget or WEB_AGENT_TIME_BUDGET
+    deadline = time.monotonic() + budget + WEB_AGENT_GRACE
+    events: "queue.Queue" = queue.Queue()
+    handler = _web_stream_handler_class()(events)
+    done = object()
+    result = {}
+    streamed = ""  # relayed since the last retraction
+
+    def _run():
+        try:
+            agent = _web_executor(max_iterations, budget)
+            agent_input = {"input": _web_input(question, prefetched)}
+            result["output"] = agent.invoke(agent_input, config={"callbacks": [handler]})["output"]
+        except Exception as e:
+            result["error"] = e
+        finally:
+            events.put(done)
+
+    threading.Thread(target=_run, daemon=True).start()
+    while True:
+        try:
+            event = events.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            # The executor only checks its budget between steps; stop waiting on a stuck step
+            result["error"] = TimeoutError(f"timed out after {budget:.0f}s")
+            break
+        if event is done:
+            break
+        if event[0] == RETRACT:
+            if streamed:
+                yield (RETRACT, streamed)
+            streamed = ""
+            continue
+        if event[0] == TOKEN:
+            streamed += event[1]
+        yield event
+
+    if "error" in result:
+        prefix = "\n" if streamed else ""
+        yield (TOKEN, f"{prefix}Final Answer: (Web search error) {str(result['error'])}")
+        return
+    output = result.get("output", "")
+    answer = _format_web_answer(output)
+    # The parser cuts the final answer short of any Action text the model kept writing, and
+    # parsing fallbacks and iteration limits never emit a 'Final Answer:' line at all
+    if streamed.strip() != answer:
+        if streamed.startswith(answer):
+            yield (RETRACT, streamed[len(answer):])
+        else:
+            if streamed:
+                yield (RETRACT, streamed)
+            yield (TOKEN, answer)
+    if not _hit_agent_limit(output):
+        yield (_SOURCE, "web")
+
+def _normalize_question(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+def _answer_cache_key(question: str, doc_hash: str) -> str:
+    # The retrieval settings decide which PDF context the prompt holds, so they key answers too
+    from tools.pdf_relevance_checker import CONTEXT_TOKEN_BUDGET, EMBEDDING_MODEL_ID, RETRIEVAL_MODE
+
+    raw = "\x1f".join((
+        _normalize_question(question), doc_hash, LLM_MODEL, PROMPT_VERSION,
+        EMBEDDING_MODEL_ID, RETRIEVAL_MODE, str(CONTEXT_TOKEN_BUDGET),
+    ))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _cache_answer(key: str, answer: str, source: Optional[str]) -> None:
+    if source is None or not answer:
+        return
+    _answer_cache.set(key, answer, PDF_ANSWER_TTL if source == "pdf" else WEB_ANSWER_TTL)
+
+def _not_ready_message(job: dict) -> str:
+    return (
+        f"'{job['name']}' is still being processed ({describe_job(job)}). "
+        "Please ask again once it shows as ready."
+    )
 
 def _is_greeting_or_goodbye(text: str) -> Optional[str]:
-    greetings = ["hi", "hello", "hey", "good morning", "good evening"]
-    goodbyes = ["bye", "goodbye", "see you", "take care", "good night"]
+    from tools.fast_router import GREETING, GOODBYE, match_rules
 
-    lowered = text.strip().lower()
-    if any(lowered == g for g in greetings):
+    # Only exact small talk is answered directly; a classifier guess, however confident,
+    # could swallow a real question ("hello world program in python")
+    label = match_rules(text)
+    if label == GREETING:
         return "Hello! How can I help you today?"
-    if any(lowered == g for g in goodbyes):
+    if label == GOODBYE:
         return "Goodbye! Have a great day!"
     return None
 
+def _single(doc_ids: List[str]) -> Optional[str]:
+    # pdf_bytes' own hash is known only when it is the sole document id
+    return doc_ids[0] if len(doc_ids) == 1 else None
+
+def _not_ready_reason(doc_ids: List[str]) -> Optional[str]:
+    """Explain which selected document is still being ingested, or None if none is."""
+    for doc_id in doc_ids:
+        pending = pending_status(doc_id)
+        if pending:
+            return _not_ready_message(pending)
+    return None
+
+def _searched_documents(doc_ids: List[str]) -> bool:
+    """Whether every selected document is indexed, so a retrieval over them really happened."""
+    from tools.pdf_relevance_checker import is_ingested
+
+    return all(is_ingested(doc_id) for doc_id in doc_ids)
+
+def apply_event(answer: str, kind: str, value: str) -> str:
+    """The answer text after one ask_agent_stream event (TOKEN appends, RETRACT removes)."""
+    if kind == TOKEN:
+        return answer + value
+    if kind == RETRACT and value and answer.endswith(value):
+        return answer[:-len(value)]
+    return answer
+
+def _uncached(events: Iterator[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    # Dropping the source event keeps the answer out of the answer cache
+    return (event for event in events if event[0] != _SOURCE)
+
+def _route_stream(
+    question: str,
+    pdf_bytes: Optional[bytes],
+    doc_ids: List[str],
+    max_iterations: Optional[int],
+    time_budget: Optional[float],
+    speculative: bool,
+) -> Iterator[Tuple[str, str]]:
+    web_search = None
+    searched = True  # an answer is cached under the documents' key only if they were all searched
+    # PDF pipeline (if PDF provided)
+    if doc_ids:
+        reason = _not_ready_reason(doc_ids)
+        if reason:
+            # Ingestion is running in the background; answer now instead of blocking on it
+            yield (STATUS, "document not ready")
+            yield (TOKEN, reason)
+            return
+
+        if speculative:
+            web_search = _speculate_web_search(question)
+        yield (STATUS, "retrieving")
+        from tools.pdf_relevance_checker import add_pdf_if_new, retrieve_relevant_context
+
+        try:
+            if pdf_bytes:
+                add_pdf_if_new(pdf_bytes, vectorstore_dir=VECTOR_STORE_DIR, doc_hash=_single(doc_ids))
+            pdf_context = retrieve_relevant_context(question, k=4, doc_ids=doc_ids)
+            searched = _searched_documents(doc_ids)
+        except Exception:
+            pdf_context, searched = "", False
+
+        if pdf_context.strip():
+            yield (STATUS, "answering from PDF")
+            tokens = _stream_pdf_answer(llm, question, pdf_context)
+            head = _read_answer_head(tokens)
+            if head.lstrip().upper().startswith(_INSUFFICIENT):
+                tokens.close()
+                yield (TOKEN, "From the PDF: not enough info.\n")
+                web_answer = _stream_web_answer(question, max_iterations, time_budget, web_search)
+                yield from (web_answer if searched else _uncached(web_answer))
+                return
+            if web_search is not None:
+                web_search.cancel()  # PDF answer confirmed; a running search only fills the cache
+            yield (TOKEN, "Final Answer: ")
+            yield (TOKEN, head.lstrip())
+            for token in tokens:
+                yield (TOKEN, token)
+            if searched:
+                yield (_SOURCE, "pdf")
+            return
+
+    # Web fallback for all other cases
+    web_answer = _stream_web_answer(question, max_iterations, time_budget, web_search)
+    yield from (web_answer if searched else _uncached(web_answer))
+
+async def _aroute(
+    question: str,
+    pdf_bytes: Optional[bytes],
+    doc_ids: List[str],
+    max_iterations: Optional[int],
+    time_budget: Optional[float],
+    speculative: bool,
+) -> Tuple[str, Optional[str]]:
+    """Returns (answer, source) where source is None when the answer must not be cached."""
+    web_search = None
+    searched = True
+    if doc_ids:
+        reason = _not_ready_reason(doc_ids)
+        if reason:
+            return reason, None
+
+        if speculative:
+            web_search = _speculate_web_search(question)
+
+        from tools.pdf_relevance_checker import add_pdf_if_new, aretrieve_relevant_context
+
+        loop = asyncio.get_running_loop()
+        try:
+            if pdf_bytes:
+                await loop.run_in_executor(None, add_pdf_if_new, pdf_bytes, VECTOR_STORE_DIR, _single(doc_ids))
+            pdf_context = await aretrieve_relevant_context(question, k=4, doc_ids=doc_ids)
+            searched = await loop.run_in_executor(None, _searched_documents, doc_ids)
+        except Exception:
+            pdf_context, searched = "", False
+
+        if pdf_context.strip():
+            pdf_answer = (await _aanswer_from_pdf(llm, question, pdf_context)).strip()
+            if pdf_answer.upper().startswith(_INSUFFICIENT):
+                prefetched = await _aprefetched_results(web_search)
+                web_answer, ok = await _aanswer_via_web(question, max_iterations, time_budget, prefetched)
+                return f"From the PDF: not enough info.\n{web_answer}", "web" if ok and searched else None
+            if web_search is not None:
+                web_search.cancel()
+            return f"Final Answer: {pdf_answer}", "pdf" if searched else None
+
+    prefetched = await _aprefetched_results(web_search)
+    web_answer, ok = await _aanswer_via_web(question, max_iterations, time_budget, prefetched)
+    return web_answer, "web" if ok and searched else None
+
 # ------------------------
 # Public API
 # ------------------------
-def ask_agent(question: str, pdf_bytes: Optional[bytes] = None) -> str:
+def ask_agent_stream(
+    question: str,
+    pdf_bytes: Optional[bytes] = None,
+    max_iterations: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    doc_ids: Optional[List[str]] = None,
+    speculative: Optional[bool] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Streaming variant of ask_agent. Yields (kind, value) tuples:
+      - (STATUS, "retrieving" | "answering from PDF" | "searching web" | "cached answer" | ...) routing events
+      - (TOKEN, text) answer fragments; joined they form the ask_agent answer.
+      - (RETRACT, text) the answer so far ends with text that must be removed (a web answer
+        streamed before the agent rejected it); apply_event folds events into the answer.
+    max_iterations / time_budget cap the web ReAct loop for this request.
+    speculative (default SPECULATIVE_WEB) searches the web while the PDF branch runs.
+    """
+    init()
+    # 1) Handle greetings/goodbyes
+    direct = _is_greeting_or_goodbye(question)
+    if direct:
+        yield (TOKEN, direct)
+        return
+
+    # 2) Deterministic (temperature=0) answers are served from the cache when possible
+    from tools.pdf_relevance_checker import pdf_hash
+
+    if pdf_bytes and not doc_ids:
+        doc_ids = [pdf_hash(pdf_bytes)]
+    doc_ids = sorted(set(doc_ids or []))
+    key = _answer_cache_key(question, ",".join(doc_ids))
+    cached = _answer_cache.get(key)
+    if cached is not None:
+        yield (STATUS, "cached answer")
+        yield (TOKEN, cached)
+        return
+
+    # 3) PDF first, then web; only completed, successful answers are cached
+    answer, source = "", None
+    speculative = SPECULATIVE_WEB if speculative is None else speculative
+    for kind, value in _route_stream(question, pdf_bytes, doc_ids, max_iterations, time_budget, speculative):
+        if kind == _SOURCE:
+            source = value
+            continue
+        answer = apply_event(answer, kind, value)
+        yield (kind, value)
+    _cache_answer(key, answer.strip(), source)
+
+def ask_agent(
+    question: str,
+    pdf_bytes: Optional[bytes] = None,
+    max_iterations: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    doc_ids: Optional[List[str]] = None,
+    speculative: Optional[bool] = None,
+) -> str:
     """
     Routing logic:
       1) Greeting/Goodbye → answer directly.
+      1b) Same question (normalized) on the same PDF answered before → cached answer.
       2) If PDF relevant:
          - Answer from PDF.
          - If insufficient → fallback to web.
       3) Else → answer via web search.
+
+    Documents are given either as pdf_bytes (hashed, ingested if new) or, cheaper, as
+    doc_ids of already ingested PDFs (see tools.document_registry.resolve_doc_id).
     """
-    # 1) Handle greetings/goodbyes
+    answer = ""
+    for kind, value in ask_agent_stream(question, pdf_bytes, max_iterations, time_budget, doc_ids, speculative):
+        answer = apply_event(answer, kind, value)
+    return answer.strip()
+
+async def ask_agent_async(
+    question: str,
+    pdf_bytes: Optional[bytes] = None,
+    max_iterations: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    doc_ids: Optional[List[str]] = None,
+    speculative: Optional[bool] = None,
+) -> str:
+    """
+    Async ask_agent with the same routing. Ollama calls go through the async client;
+    hashing, PDF extraction, embedding of new PDFs and FAISS search run in the default executor,
+    so one event loop can serve many sessions concurrently.
+    """
+    init()  # blocking, but only once per process
     direct = _is_greeting_or_goodbye(question)
     if direct:
         return direct
 
-    # 2) PDF pipeline (if PDF provided)
-    if pdf_bytes:
-        try:
-            add_pdf_if_new(pdf_bytes, vectorstore_dir=VECTOR_STORE_DIR)
-            pdf_context = retrieve_relevant_context(question, k=4)
-        except Exception:
-            pdf_context = ""
+    if pdf_bytes and not doc_ids:
+        from tools.pdf_relevance_checker import pdf_hash
 
-        if pdf_context.strip():
-            pdf_answer = _answer_from_pdf(llm, question, pdf_context).strip()
-            if pdf_answer.upper().startswith("INSUFFICIENT"):
-                return f"From the PDF: not enough info.\n{_answer_via_web(llm, question)}"
-            return f"Final Answer: {pdf_answer}"
+        loop = asyncio.get_running_loop()
+        doc_ids = [await loop.run_in_executor(None, pdf_hash, pdf_bytes)]
+    doc_ids = sorted(set(doc_ids or []))
+    key = _answer_cache_key(question, ",".join(doc_ids))
+    cached = _answer_cache.get(key)
+    if cached is not None:
+        return cached
 
-    # 3) Web fallback for all other cases
-    return _answer_via_web(llm, question)
+    speculative = SPECULATIVE_WEB if speculative is None else speculative
+    answer, source = await _aroute(question, pdf_bytes, doc_ids, max_iterations, time_budget, speculative)
+    _cache_answer(key, answer, source)
+    return answer
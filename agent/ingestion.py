@@ -0,0 +1,129 @@
+# agent/ingestion.py
+import os
+import time
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from tools.document_registry import resolve_doc_id
+
+# Job states, in the order a job moves through them
+QUEUED = "queued"
+EXTRACTING = "extracting"
+EMBEDDING = "embedding"
+READY = "ready"
+FAILED = "failed"
+
+ACTIVE_STATES = (QUEUED, EXTRACTING, EMBEDDING)
+
+# ------------------------
+# Job registry + single background worker
+# ------------------------
+_jobs: Dict[str, dict] = {}  # pdf path -> job
+_jobs_by_hash: Dict[str, dict] = {}  # pdf_hash -> job
+_jobs_lock = threading.Lock()
+_queue: "queue.Queue[dict]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+
+
+def _update(job: dict, **fields) -> None:
+    with _jobs_lock:
+        job.update(fields, updated=time.time())
+
+
+def _run_job(job: dict) -> None:
+    from tools.pdf_relevance_checker import add_pdf_if_new  # loads FAISS and LangChain; only on first job
+
+    try:
+        with open(job["path"], "rb") as f:
+            pdf_bytes = f.read()
+        add_pdf_if_new(
+            pdf_bytes,
+            doc_hash=job["doc_hash"],
+            filename=job["name"],
+            on_stage=lambda stage: _update(job, state=stage),
+            on_progress=lambda done, total: _update(job, done=done, total=total),
+        )
+        _update(job, state=READY)
+    except Exception as e:
+        _update(job, state=FAILED, error=str(e))
+
+
+def _work() -> None:
+    while True:
+        job = _queue.get()
+        try:
+            _run_job(job)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_worker() -> None:
+    global _worker
+    with _jobs_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="pdf-ingestion", daemon=True)
+            _worker.start()
+
+
+# ------------------------
+# Public API
+# ------------------------
+def enqueue_pdf(path: str) -> dict:
+    """Queue a PDF on disk for background ingestion; re-queuing a pending or ready file is a no-op."""
+    doc_hash = resolve_doc_id(path)
+    with _jobs_lock:
+        existing = _jobs.get(path)
+        if existing is not None and existing["doc_hash"] == doc_hash and existing["state"] != FAILED:
+            return dict(existing)
+        job = {
+            "path": path,
+            "name": os.path.basename(path),
+            "doc_hash": doc_hash,
+            "state": QUEUED,
+            "done": 0,
+            "total": 0,
+            "error": None,
+            "updated": time.time(),
+        }
+        _jobs[path] = job
+        _jobs_by_hash[doc_hash] = job
+    _ensure_worker()
+    _queue.put(job)
+    return dict(job)
+
+
+def job_status(path: str) -> Optional[dict]:
+    """Snapshot of the ingestion job for a PDF path, or None if it was never queued."""
+    with _jobs_lock:
+        job = _jobs.get(path)
+        return dict(job) if job is not None else None
+
+
+def pending_status(doc_hash: str) -> Optional[dict]:
+    """Snapshot of the job for this pdf_hash while it is still queued or running, else None."""
+    with _jobs_lock:
+        job = _jobs_by_hash.get(doc_hash)
+        return dict(job) if job is not None and job["state"] in ACTIVE_STATES else None
+
+
+def all_jobs() -> List[dict]:
+    with _jobs_lock:
+        return [dict(job) for job in _jobs.values()]
+
+
+def forget(path: str) -> None:
+    """Drop the job record for a deleted file."""
+    with _jobs_lock:
+        job = _jobs.pop(path, None)
+        if job is not None and _jobs_by_hash.get(job["doc_hash"]) is job:
+            del _jobs_by_hash[job["doc_hash"]]
+
+
+def describe(job: dict) -> str:
+    """Short human-readable status, e.g. 'embedding 64/210 chunks'."""
+    if job["state"] == EMBEDDING and job["total"]:
+        return f"{EMBEDDING} {job['done']}/{job['total']} chunks"
+    if job["state"] == FAILED:
+        return f"{FAILED}: {job['error']}"
+    return job["state"]
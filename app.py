@@ -1,6 +1,10 @@
 import os
+import textwrap
 import streamlit as st
-from agent.agent_runner import ask_agent
+from agent.agent_runner import apply_event, ask_agent_stream, STATUS, init as init_agent
+from agent import ingestion
+from tools.document_registry import resolve_doc_id, forget as forget_doc_id
+from tools.pdf_relevance_checker import is_ingested, catalog_stats
 import time
 from datetime import datetime
 import base64
@@ -8,6 +12,7 @@ import base64
 # ---------- CONFIG ----------
 PDF_STORE = "uploaded_pdfs"
 os.makedirs(PDF_STORE, exist_ok=True)
+CHAT_WINDOW = 20  # messages shown at once; "load earlier" reveals this many more
 
 # ---------- PAGE SETTINGS ----------
 st.set_page_config(
@@ -21,6 +26,15 @@ st.set_page_config(
     }
 )
 
+# ---------- CACHED RESOURCES ----------
+@st.cache_resource(show_spinner="Loading models and documents...")
+def load_agent():
+    """Build the agent's models, caches and vector store once per server process, shared by all sessions"""
+    init_agent()
+
+# The document catalog shown in the sidebar is attached by the agent
+load_agent()
+
 # ---------- CUSTOM CSS ----------
 def load_css():
     st.markdown("""
@@ -468,20 +482,127 @@ def format_file_size(size_bytes):
         i += 1
     return f"{size_bytes:.1f}{size_names[i]}"
 
-def get_pdf_info(pdf_path):
-    """Get PDF file information"""
-    if os.path.exists(pdf_path):
-        size = os.path.getsize(pdf_path)
-        return {
-            'size': format_file_size(size),
-            'exists': True
-        }
-    return {'exists': False}
+@st.cache_data(show_spinner=False)
+def list_pdfs(store, modified_ns):
+    """
+    (file name, formatted size) of the stored PDFs from one directory scan. Keyed by the
+    directory's modification time, so any upload or delete lists it again.
+    """
+    with os.scandir(store) as entries:
+        return sorted(
+            (entry.name, format_file_size(entry.stat().st_size))
+            for entry in entries
+            if entry.name.endswith('.pdf') and entry.is_file()
+        )
+
+def stored_pdfs():
+    return list_pdfs(PDF_STORE, os.stat(PDF_STORE).st_mtime_ns)
+
+def select_pdf(pdf_file):
+    st.session_state.selected_pdf = pdf_file
+
+def delete_pdf(pdf_file):
+    pdf_path = os.path.join(PDF_STORE, pdf_file)
+    os.remove(pdf_path)
+    ingestion.forget(pdf_path)
+    forget_doc_id(pdf_path)
+    list_pdfs.clear()
+    if st.session_state.selected_pdf == pdf_file:
+        st.session_state.selected_pdf = None
+
+def render_metric(value, label):
+    """Build the HTML for one sidebar statistic"""
+    return f"""
+    <div class="metric-container">
+        <div class="metric-value">{value}</div>
+        <div class="metric-label">{label}</div>
+    </div>
+    """
+
+def render_message(speaker, message, timestamp):
+    """Build the HTML bubble for one chat message"""
+    if speaker == "user":
+        return f"""
+        <div class="message user-message">
+            <div class="message-content">
+                {message}
+                <div class="message-time">{timestamp}</div>
+            </div>
+            <div class="message-avatar user-avatar">🧑</div>
+        </div>
+        """
+    return f"""
+    <div class="message bot-message">
+        <div class="message-avatar bot-avatar">🤖</div>
+        <div class="message-content">
+            {message}
+            <div class="message-time">{timestamp}</div>
+        </div>
+    </div>
+    """
+
+def new_message(speaker, message):
+    """
+    A chat history entry. Its time is taken when it is added and its HTML is built once,
+    so redrawing the history costs the same however long the session gets.
+    """
+    timestamp = datetime.now().strftime("%H:%M")
+    html = textwrap.dedent(render_message(speaker, message, timestamp)).strip()
+    return {"speaker": speaker, "message": message, "time": timestamp, "html": html}
+
+def load_earlier():
+    st.session_state.history_window += CHAT_WINDOW
+
+def render_typing_indicator(label):
+    """Build the HTML for the typing indicator with a status label"""
+    return f"""
+    <div class="message bot-message">
+        <div class="message-avatar bot-avatar">🤖</div>
+        <div class="typing-indicator">
+            <span>{label}</span>
+            <div class="typing-dots">
+                <div class="dot"></div>
+                <div class="dot"></div>
+                <div class="dot"></div>
+            </div>
+        </div>
+    </div>
+    """
+
+STATUS_ICONS = {
+    ingestion.QUEUED: "🕒",
+    ingestion.EXTRACTING: "📖",
+    ingestion.EMBEDDING: "🧠",
+    ingestion.READY: "✅",
+    ingestion.FAILED: "⚠️",
+}
+
+def render_ingestion_status():
+    """Per-document ingestion status; polls while jobs are running"""
+    jobs = ingestion.all_jobs()
+    if not jobs:
+        return
+    st.markdown("### ⚙️ Processing")
+    for job in jobs:
+        st.markdown(
+            f"<small>{STATUS_ICONS.get(job['state'], '')} {job['name']} — {ingestion.describe(job)}</small>",
+            unsafe_allow_html=True
+        )
+        if job["state"] == ingestion.EMBEDDING and job["total"]:
+            st.progress(job["done"] / job["total"])
+    if not any(job["state"] in ingestion.ACTIVE_STATES for job in jobs):
+        if st.session_state.get("ingestion_active"):
+            # Last job just finished: refresh the full page once, which also stops polling
+            st.session_state.ingestion_active = False
+            st.rerun()
 
 # ---------- INITIALIZE SESSION STATE ----------
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+if "history_window" not in st.session_state:
+    st.session_state.history_window = CHAT_WINDOW
+
 if "selected_pdf" not in st.session_state:
     st.session_state.selected_pdf = None
 
@@ -597,70 +718,67 @@ with st.sidebar:
         for uploaded_file in uploaded_files:
             pdf_path = os.path.join(PDF_STORE, uploaded_file.name)
             
-            # Save file if it doesn't exist
+            # Save file if it doesn't exist, then index it in the background
             if not os.path.exists(pdf_path):
                 with open(pdf_path, "wb") as f:
                     f.write(uploaded_file.read())
-                st.success(f"✅ Saved: {uploaded_file.name}")
+                ingestion.enqueue_pdf(pdf_path)
+                list_pdfs.clear()
+                st.success(f"✅ Saved: {uploaded_file.name} (queued for processing)")
     
     # Display uploaded PDFs
-    pdf_files = [f for f in os.listdir(PDF_STORE) if f.endswith('.pdf')]
+    pdf_files = stored_pdfs()
     
     if pdf_files:
         st.markdown("### 📚 Available Documents")
         
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(PDF_STORE, pdf_file)
-            pdf_info = get_pdf_info(pdf_path)
-            
+        # Selecting and deleting run as callbacks before the rerun, so a single run shows the result
+        for pdf_file, pdf_size in pdf_files:
             is_selected = st.session_state.selected_pdf == pdf_file
             
             # Create columns for PDF item
             col1, col2, col3 = st.columns([3, 1, 1])
             
             with col1:
-                if st.button(
+                st.button(
                     f"📄 {pdf_file[:20]}..." if len(pdf_file) > 20 else f"📄 {pdf_file}",
                     key=f"select_{pdf_file}",
-                    help=f"Click to select for context\nSize: {pdf_info['size']}",
-                    type="primary" if is_selected else "secondary"
-                ):
-                    st.session_state.selected_pdf = pdf_file
-                    st.rerun()
+                    help=f"Click to select for context\nSize: {pdf_size}",
+                    type="primary" if is_selected else "secondary",
+                    on_click=select_pdf,
+                    args=(pdf_file,)
+                )
             
             with col2:
-                st.markdown(f"<small>{pdf_info['size']}</small>", unsafe_allow_html=True)
+                st.markdown(f"<small>{pdf_size}</small>", unsafe_allow_html=True)
             
             with col3:
-                if st.button("🗑️", key=f"delete_{pdf_file}", help="Delete file"):
-                    os.remove(pdf_path)
-                    if st.session_state.selected_pdf == pdf_file:
-                        st.session_state.selected_pdf = None
-                    st.rerun()
+                st.button("🗑️", key=f"delete_{pdf_file}", help="Delete file", on_click=delete_pdf, args=(pdf_file,))
     
     else:
         st.info("📝 No documents uploaded yet. Upload a PDF to get started!")
     
+    # Ingestion status (auto-refreshes every 2s while any job is running)
+    ingestion_active = any(job["state"] in ingestion.ACTIVE_STATES for job in ingestion.all_jobs())
+    if ingestion_active:
+        st.session_state.ingestion_active = True
+    st.fragment(render_ingestion_status, run_every=2 if ingestion_active else None)()
+    
     # Statistics
     st.markdown("---")
     st.markdown("### 📊 Statistics")
     
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{len(pdf_files)}</div>
-            <div class="metric-label">Documents</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(render_metric(len(pdf_files), "Documents"), unsafe_allow_html=True)
     
     with col2:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{len(st.session_state.chat_history)}</div>
-            <div class="metric-label">Messages</div>
-        </div>
-        """, unsafe_allow_html=True)
+        # Updated in place once an answer is added, without another run
+        messages_metric = st.empty()
+        messages_metric.markdown(render_metric(len(st.session_state.chat_history), "Messages"), unsafe_allow_html=True)
+    
+    indexed = catalog_stats()
+    st.caption(f"🗂️ Indexed: {indexed['documents']} documents · {indexed['pages']} pages · {indexed['chunks']} chunks")
     
     # Context status
     if st.session_state.selected_pdf:
@@ -700,46 +818,21 @@ with chat_col1:
     
     with chat_container:
         if st.session_state.chat_history:
-            # Display chat messages
-            for i, (speaker, message) in enumerate(st.session_state.chat_history):
-                timestamp = datetime.now().strftime("%H:%M")
-                
-                if speaker == "user":
-                    st.markdown(f"""
-                    <div class="message user-message">
-                        <div class="message-content">
-                            {message}
-                            <div class="message-time">{timestamp}</div>
-                        </div>
-                        <div class="message-avatar user-avatar">🧑</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="message bot-message">
-                        <div class="message-avatar bot-avatar">🤖</div>
-                        <div class="message-content">
-                            {message}
-                            <div class="message-time">{timestamp}</div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Only the latest messages are drawn, as one block of their pre-built HTML
+            history = st.session_state.chat_history
+            window = st.session_state.history_window
+            if len(history) > window:
+                st.button(
+                    f"⬆️ Load earlier messages ({len(history) - window} hidden)",
+                    key="load_earlier",
+                    on_click=load_earlier
+                )
+            st.markdown("\n\n".join(entry["html"] for entry in history[-window:]), unsafe_allow_html=True)
             
-            # Show typing indicator
+            # Show typing indicator; replaced by the streamed answer while processing
+            typing_placeholder = st.empty()
             if st.session_state.typing:
-                st.markdown("""
-                <div class="message bot-message">
-                    <div class="message-avatar bot-avatar">🤖</div>
-                    <div class="typing-indicator">
-                        <span>Assistant is typing</span>
-                        <div class="typing-dots">
-                            <div class="dot"></div>
-                            <div class="dot"></div>
-                            <div class="dot"></div>
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                typing_placeholder.markdown(render_typing_indicator("Assistant is typing"), unsafe_allow_html=True)
         
         else:
             # Empty state
@@ -772,10 +865,25 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# ---------- HANDLE USER INPUT ----------
+# Button callbacks run before the rerun the click triggers, so that single run already
+# shows the question, streams the answer and leaves the updated history on screen
+def send_message():
+    user_input = st.session_state.message_input.strip()
+    if user_input:
+        # Add user message to history and show the typing indicator
+        st.session_state.chat_history.append(new_message("user", user_input))
+        st.session_state.typing = True
+
+def clear_chat():
+    st.session_state.chat_history = []
+    st.session_state.history_window = CHAT_WINDOW
+    st.session_state.typing = False
+
 input_col1, input_col2, input_col3 = st.columns([4, 1, 1])
 
 with input_col1:
-    user_input = st.text_area(
+    st.text_area(
         "Your question:",
         placeholder="Ask me anything about your documents...",
         height=100,
@@ -783,61 +891,60 @@ with input_col1:
     )
 
 with input_col2:
-    send_button = st.button("🚀 Send", type="primary", use_container_width=True)
+    st.button("🚀 Send", type="primary", use_container_width=True, on_click=send_message)
 
 with input_col3:
-    clear_button = st.button("🗑️ Clear", type="secondary", use_container_width=True)
+    st.button("🗑️ Clear", type="secondary", use_container_width=True, on_click=clear_chat)
 
 # Remove the closing div since we removed the opening one
 
-# ---------- HANDLE USER INPUT ----------
-def send_message():
-    if user_input.strip():
-        # Add user message to history
-        st.session_state.chat_history.append(("user", user_input.strip()))
-        
-        # Show typing indicator
-        st.session_state.typing = True
-        st.rerun()
-
 def process_message():
     if st.session_state.typing and st.session_state.chat_history:
         last_message = st.session_state.chat_history[-1]
-        if last_message[0] == "user":
-            # Get PDF bytes if selected
-            pdf_bytes = None
+        if last_message["speaker"] == "user":
+            # Identify the selected PDF by content hash; a stat() call unless the file changed
+            doc_ids = None
             if st.session_state.selected_pdf:
                 pdf_path = os.path.join(PDF_STORE, st.session_state.selected_pdf)
                 try:
-                    with open(pdf_path, "rb") as f:
-                        pdf_bytes = f.read()
+                    doc_id = resolve_doc_id(pdf_path)
+                    if not is_ingested(doc_id):
+                        # No-op if already queued; the agent replies that it is still processing
+                        ingestion.enqueue_pdf(pdf_path)
+                    doc_ids = [doc_id]
                 except Exception as e:
                     st.error(f"Error reading PDF: {e}")
             
-            # Get response from agent
+            # Stream the response into the typing placeholder
+            response = ""
             try:
-                with st.spinner("Processing your question..."):
-                    response = ask_agent(last_message[1], pdf_bytes=pdf_bytes)
+                for kind, value in ask_agent_stream(last_message["message"], doc_ids=doc_ids):
+                    if kind == STATUS:
+                        if not response:
+                            typing_placeholder.markdown(
+                                render_typing_indicator(f"{value.capitalize()}..."), unsafe_allow_html=True
+                            )
+                        continue
+                    response = apply_event(response, kind, value)
+                    typing_placeholder.markdown(
+                        render_message("assistant", response + " ▌", datetime.now().strftime("%H:%M")),
+                        unsafe_allow_html=True
+                    )
                 
                 # Add bot response to history
-                st.session_state.chat_history.append(("assistant", response))
+                st.session_state.chat_history.append(new_message("assistant", response.strip()))
                 
             except Exception as e:
                 error_msg = f"I apologize, but I encountered an error while processing your request: {str(e)}"
-                st.session_state.chat_history.append(("assistant", error_msg))
+                st.session_state.chat_history.append(new_message("assistant", error_msg))
             
             finally:
                 st.session_state.typing = False
-                st.rerun()
-
-# Handle button clicks
-if send_button and user_input.strip():
-    send_message()
-
-if clear_button and st.session_state.chat_history:
-    st.session_state.chat_history = []
-    st.session_state.typing = False
-    st.rerun()
+                # Replace the stream with the final bubble instead of rerunning the whole page
+                typing_placeholder.markdown(st.session_state.chat_history[-1]["html"], unsafe_allow_html=True)
+                messages_metric.markdown(
+                    render_metric(len(st.session_state.chat_history), "Messages"), unsafe_allow_html=True
+                )
 
 # Process pending messages
 if st.session_state.typing:
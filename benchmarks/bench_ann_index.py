@@ -0,0 +1,104 @@
+# benchmarks/bench_ann_index.py
+"""
+Recall@k, query latency and memory of the base index factories SegmentedFAISS can build
+(tools.segment_store.build_index), measured against the exact Flat index as ground truth.
+
+Vectors are a synthetic Gaussian mixture (chunks of a corpus cluster by topic) unless a
+.npy matrix of real embeddings is given; queries are perturbed corpus vectors.
+
+    python benchmarks/bench_ann_index.py [--vectors 20000] [--dim 1024] [--queries 200] [--k 4]
+    python benchmarks/bench_ann_index.py --embeddings chunk_vectors.npy
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.segment_store import build_index  # noqa: E402
+
+FACTORIES = ["Flat", "SQfp16", "SQ8", "HNSW32", "IVF256,Flat", "IVF256,SQfp16", "IVF256,PQ64"]
+
+
+def _synthetic(n, dim, clusters, rng):
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def _tune(index, nprobe, ef_search):
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except Exception:
+        pass
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def _search_one_by_one(index, queries, k):
+    """The app searches one question at a time, so latency is measured per single query."""
+    rows, samples = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        samples.append((time.perf_counter() - start) * 1000)
+        rows.append(ids[0])
+    return np.asarray(rows), samples
+
+
+def _recall(found, truth, k):
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--embeddings", help=".npy matrix of real chunk embeddings")
+    parser.add_argument("--factories", nargs="+", default=FACTORIES)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+    else:
+        vectors = _synthetic(args.vectors, args.dim, args.clusters, rng)
+    picks = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"vectors: {len(vectors)}  dim: {vectors.shape[1]}  queries: {args.queries}  k: {args.k}")
+    print(f"{'factory':>16} {'build s':>8} {'recall@k':>9} {'mean ms':>8} {'p95 ms':>8} {'MB':>8} {'B/vec':>7}")
+    for factory in args.factories:
+        start = time.perf_counter()
+        try:
+            index, used = build_index(factory, vectors, min_train_points=0)
+        except Exception as e:
+            print(f"{factory:>16} skipped: {e}")
+            continue
+        build_s = time.perf_counter() - start
+        _tune(index, args.nprobe, args.ef_search)
+        found, samples = _search_one_by_one(index, queries, args.k)
+        size = len(faiss.serialize_index(index))
+        label = factory if used == factory else f"{factory}->{used}"
+        print(
+            f"{label:>16} {build_s:>8.2f} {_recall(found, truth, args.k):>9.3f} "
+            f"{np.mean(samples):>8.3f} {sorted(samples)[int(len(samples) * 0.95)]:>8.3f} "
+            f"{size / 1e6:>8.1f} {size / len(vectors):>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_context_packing.py
+"""
+Prompt tokens per query before and after context packing (tools.context_packer): the old
+context joined the top-k chunks verbatim, overlaps included; the packed context merges them
+by position and fits them into a token budget.
+
+Chunks come from the given PDFs, or from this repository's own .py/.md files as a sample
+corpus. Queries are word runs sampled from the corpus and retrieved with BM25, so no
+Ollama is needed. Token counts use tiktoken when installed, else ~4 characters per token.
+
+    python benchmarks/bench_context_packing.py [--pdf a.pdf b.pdf] [--queries 200] [--k 4 8] [--budget 1536]
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.bm25_index import BM25Index  # noqa: E402
+from tools.context_packer import build_token_counter, estimate_tokens, pack_context  # noqa: E402
+from tools.pdf_extract import extract_pages  # noqa: E402
+from tools.pdf_relevance_checker import _chunk_pages  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _corpus(pdfs):
+    """{doc_id: chunks} with doc_id and start_index metadata, as ingestion stores them."""
+    if pdfs:
+        sources = {path: extract_pages(open(path, "rb").read()) for path in pdfs}
+    else:
+        paths = sorted(glob.glob(os.path.join(REPO, "**", "*.py"), recursive=True))
+        paths += sorted(glob.glob(os.path.join(REPO, "*.md")))
+        sources = {path: [(1, open(path, encoding="utf-8").read())] for path in paths}
+    corpus = {}
+    for doc_id, pages in sources.items():
+        chunks = _chunk_pages(pages)
+        for chunk in chunks:
+            chunk.metadata["doc_id"] = doc_id
+        if chunks:
+            corpus[doc_id] = chunks
+    return corpus
+
+
+def _queries(corpus, n, rng):
+    chunks = [chunk for chunks in corpus.values() for chunk in chunks]
+    queries = []
+    while len(queries) < n:
+        words = rng.choice(chunks).page_content.split()
+        if len(words) >= 8:
+            start = rng.randrange(len(words) - 6)
+            queries.append(" ".join(words[start:start + rng.randint(3, 6)]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", nargs="*", default=[])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--budget", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    count_tokens = build_token_counter()
+    corpus = _corpus(args.pdf)
+    index = BM25Index(":memory:")
+    for doc_id, chunks in corpus.items():
+        index.add(doc_id, [chunk.page_content for chunk in chunks])
+    queries = _queries(corpus, args.queries, random.Random(args.seed))
+    print(
+        f"documents: {len(corpus)}  chunks: {sum(map(len, corpus.values()))}  queries: {len(queries)}  "
+        f"tokenizer: {'estimate' if count_tokens is estimate_tokens else 'tiktoken'}  budget: {args.budget}"
+    )
+    print(f"{'k':>3} {'raw tok':>9} {'merged tok':>11} {'packed tok':>11} {'saved':>7} {'chunks kept':>12} {'over budget':>12}")
+
+    for k in args.k:
+        raw, merged, packed, kept, over = [], [], [], [], 0
+        for query in queries:
+            docs = [corpus[doc_id][seq] for (doc_id, seq), _ in index.search(query, k)]
+            if not docs:
+                continue
+            raw.append(count_tokens("\n".join(doc.page_content for doc in docs)))
+            merged.append(count_tokens(pack_context(docs)))
+            context = pack_context(docs, args.budget, count_tokens)
+            packed.append(count_tokens(context))
+            kept.append(sum(doc.page_content in context for doc in docs) / len(docs))
+            over += raw[-1] > args.budget
+        saved = 1 - sum(packed) / sum(raw)
+        print(
+            f"{k:>3} {statistics.mean(raw):>9.1f} {statistics.mean(merged):>11.1f} {statistics.mean(packed):>11.1f} "
+            f"{saved:>6.1%} {statistics.mean(kept):>11.1%} {over:>6}/{len(raw)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_import_time.py
+"""
+Start-up cost of the agent: wall-clock and `python -X importtime` totals for importing
+agent.agent_runner in a fresh interpreter, the heaviest imports it pulls in, and the time
+init() then takes to build the LLM client, router, caches and vector store.
+
+Runs in a scratch directory so no caches or vector store of the working tree are touched.
+
+    python benchmarks/bench_import_time.py [--top 15] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INIT_SNIPPET = (
+    "import time; start = time.perf_counter(); import agent.agent_runner as a; "
+    "imported = time.perf_counter(); a.WARMUP_ON_START = False; a.init(); "
+    "print(imported - start, time.perf_counter() - imported)"
+)
+
+
+def _python(args, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def _importtime(cwd):
+    """{module: (self us, cumulative us)} from one `-X importtime` run."""
+    out = _python(["-X", "importtime", "-c", "import agent.agent_runner"], cwd).stderr
+    modules = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        modules = _importtime(cwd)
+        imports, inits = [], []
+        for _ in range(args.runs):
+            imported, initialized = map(float, _python(["-c", INIT_SNIPPET], cwd).stdout.split())
+            imports.append(imported)
+            inits.append(initialized)
+
+    total = modules.get("agent.agent_runner", (0, 0))[1]
+    print(f"modules imported: {len(modules)}  agent.agent_runner cumulative: {total / 1000:.1f} ms (-X importtime)")
+    print(f"import agent.agent_runner: {statistics.median(imports) * 1000:.1f} ms  "
+          f"init(): {statistics.median(inits) * 1000:.1f} ms  (median of {args.runs} fresh processes)")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    heaviest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (own, cumulative) in heaviest:
+        print(f"{cumulative / 1000:>14.1f} {own / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_ollama_warmup.py
+"""
+Cold versus warm Ollama latency for the chat and embedding models, through the shared
+client of tools.ollama_client.
+
+  cold      model unloaded first (keep_alive=0), so the request includes the model load
+  warm      the same request again, model resident
+  no pool   warm request on a fresh client (new HTTP connection each time)
+  prefix    prompt evaluation time of a PDF prompt whose static prefix was just evaluated,
+            versus the same prompt after an unrelated one
+
+Needs a running Ollama with the models pulled.
+
+    python benchmarks/bench_ollama_warmup.py [--llm-model llama3] [--embedding-model nomic-embed-text] [--repeats 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ollama import Client  # noqa: E402
+
+from agent.agent_runner import _pdf_prompt  # noqa: E402
+from tools.ollama_client import OLLAMA_HOST, OLLAMA_KEEP_ALIVE, shared_clients  # noqa: E402
+
+CONTEXT = "The quarterly report lists revenue of 4.2 million and an operating margin of 12 percent. " * 20
+
+
+def _ms(call):
+    start = time.perf_counter()
+    result = call()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _unload(client, model, embedding):
+    if embedding:
+        client.embed(model=model, input="", keep_alive=0)
+    else:
+        client.generate(model=model, prompt="", keep_alive=0)
+    time.sleep(1.0)  # let the server release the model
+
+
+def _request(client, model, embedding):
+    if embedding:
+        return lambda: client.embed(model=model, input="warm request", keep_alive=OLLAMA_KEEP_ALIVE)
+    return lambda: client.generate(
+        model=model, prompt="Say OK.", options={"num_predict": 1, "temperature": 0}, keep_alive=OLLAMA_KEEP_ALIVE
+    )
+
+
+def _row(name, samples):
+    print(f"{name:>34} {statistics.mean(samples):>10.1f} {min(samples):>10.1f}")
+
+
+def _bench_model(client, model, embedding, repeats):
+    cold, warm, unpooled = [], [], []
+    for _ in range(repeats):
+        _unload(client, model, embedding)
+        cold.append(_ms(_request(client, model, embedding))[0])
+        warm.append(_ms(_request(client, model, embedding))[0])
+        unpooled.append(_ms(_request(Client(host=OLLAMA_HOST), model, embedding))[0])
+    _row(f"{model} cold", cold)
+    _row(f"{model} warm", warm)
+    _row(f"{model} warm, no pool", unpooled)
+
+
+def _bench_prefix(client, model, repeats):
+    """Prompt evaluation (ms, as reported by Ollama) with and without the prefix just cached."""
+    def evaluate(prompt):
+        out = client.generate(
+            model=model, prompt=prompt, options={"num_predict": 1, "temperature": 0}, keep_alive=OLLAMA_KEEP_ALIVE
+        )
+        return out.prompt_eval_duration / 1e6, out.prompt_eval_count
+
+    reused, fresh = [], []
+    for i in range(repeats):
+        evaluate(_pdf_prompt(f"warm-up {i}", CONTEXT))
+        reused.append(evaluate(_pdf_prompt(f"margin {i}?", CONTEXT)))
+        evaluate(f"Unrelated text {i} to displace the cached prefix. " * 40)
+        fresh.append(evaluate(_pdf_prompt(f"revenue {i}?", CONTEXT)))
+    _row(f"{model} prompt eval, prefix cached", [ms for ms, _ in reused])
+    _row(f"{model} prompt eval, prefix cold", [ms for ms, _ in fresh])
+    print(f"{'tokens evaluated (cached / cold)':>34} {statistics.mean(n for _, n in reused):>10.0f} {statistics.mean(n for _, n in fresh):>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-model", default="llama3")
+    parser.add_argument("--embedding-model", default="nomic-embed-text")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    client, _ = shared_clients()
+    try:
+        client.list()
+    except Exception as e:
+        print(f"Ollama not reachable: {e}")
+        return
+    print(f"keep_alive: {OLLAMA_KEEP_ALIVE} s  repeats: {args.repeats}")
+    print(f"{'':>34} {'mean ms':>10} {'min ms':>10}")
+    _bench_model(client, args.llm_model, False, args.repeats)
+    _bench_model(client, args.embedding_model, True, args.repeats)
+    _bench_prefix(client, args.llm_model, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
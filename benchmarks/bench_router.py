@@ -0,0 +1,95 @@
+# benchmarks/bench_router.py
+"""
+Accuracy and latency of the local router (tools.fast_router) on the labeled eval set,
+against the llama3 context-presence judge it replaces.
+
+Four-way accuracy covers greeting / goodbye / context_provided / context_missing; the
+binary task is what check_context_presence answers (greetings and goodbyes count as
+context_provided). The LLM columns need a running Ollama; pass --no-llm to skip them.
+
+    python benchmarks/bench_router.py [--eval data/router/eval.jsonl] [--threshold 0.8] [--llm-model llama3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.fast_router import (  # noqa: E402
+    CONTEXT_MISSING,
+    CONTEXT_PROVIDED,
+    LLM,
+    ROUTER_TRAIN_FILE,
+    FastRouter,
+    load_examples,
+)
+
+EVAL_FILE = os.path.join(os.path.dirname(ROUTER_TRAIN_FILE), "eval.jsonl")
+
+
+def _binary(label):
+    return CONTEXT_MISSING if label == CONTEXT_MISSING else CONTEXT_PROVIDED
+
+
+def _run(classify, texts):
+    labels, samples = [], []
+    for text in texts:
+        start = time.perf_counter()
+        labels.append(classify(text))
+        samples.append((time.perf_counter() - start) * 1000)
+    return labels, samples
+
+
+def _report(name, predicted, expected, samples, four_way=True):
+    binary = sum(_binary(p) == _binary(e) for p, e in zip(predicted, expected)) / len(expected)
+    exact = f"{sum(p == e for p, e in zip(predicted, expected)) / len(expected):>9.3f}" if four_way else f"{'-':>9}"
+    p95 = sorted(samples)[int(len(samples) * 0.95)]
+    print(f"{name:>26} {exact} {binary:>9.3f} {statistics.mean(samples):>10.3f} {p95:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval", default=EVAL_FILE)
+    parser.add_argument("--train", default=ROUTER_TRAIN_FILE)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--llm-model", default="llama3")
+    parser.add_argument("--no-llm", action="store_true")
+    args = parser.parse_args()
+
+    texts, expected = load_examples(args.eval)
+    start = time.perf_counter()
+    router = FastRouter.from_jsonl(args.train, threshold=args.threshold)
+    print(f"eval messages: {len(texts)}  trained in {time.perf_counter() - start:.3f} s  threshold: {args.threshold}")
+    print(f"{'':>26} {'4-way acc':>9} {'ctx acc':>9} {'mean ms':>10} {'p95 ms':>10}")
+
+    predicted, samples = _run(lambda t: router.classify(t)[0], texts)
+    _report("router (rules + model)", predicted, expected, samples)
+    _, memo_samples = _run(lambda t: router.classify(t)[0], texts)
+    _report("router, memoized", predicted, expected, memo_samples)
+    unsure = sum(router.classifier.predict(t)[1] < args.threshold for t in texts)
+    print(f"{'would defer to LLM':>26} {unsure}/{len(texts)} messages")
+
+    if args.no_llm:
+        return
+    try:
+        from langchain_ollama import OllamaLLM
+        from tools.context_presence_judge import build_llm_context_judge
+
+        llm_judge = build_llm_context_judge(OllamaLLM(model=args.llm_model, temperature=0))
+        llm_judge("hello")  # load the model before timing
+    except Exception as e:
+        print(f"LLM judge skipped: {e}")
+        return
+
+    predicted, samples = _run(llm_judge, texts)
+    _report(f"LLM judge ({args.llm_model})", predicted, expected, samples, four_way=False)
+    hybrid = FastRouter(router.classifier, llm_judge=llm_judge, threshold=args.threshold)
+    results, samples = _run(hybrid.classify, texts)
+    _report("router + LLM fallback", [label for label, _ in results], expected, samples)
+    print(f"{'LLM calls':>26} {sum(source == LLM for _, source in results)}/{len(texts)} messages")
+
+
+if __name__ == "__main__":
+    main()
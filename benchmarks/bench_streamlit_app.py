@@ -0,0 +1,77 @@
+# benchmarks/bench_streamlit_app.py
+"""
+Server-side time per interaction of app.py with many PDFs in the store, using Streamlit's
+AppTest (the script runs in-process, reruns included, no browser).
+
+Runs in a scratch directory holding --pdfs placeholder files in uploaded_pdfs/; the agent
+answer is replaced by a fixed token stream, so only the app's own work is measured.
+
+    python benchmarks/bench_streamlit_app.py [--pdfs 500] [--repeats 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import agent.agent_runner as agent_runner  # noqa: E402
+
+
+def _fake_answer(question, pdf_bytes=None, max_iterations=None, time_budget=None, doc_ids=None, speculative=None):
+    yield (agent_runner.STATUS, "retrieving")
+    for token in ("Final Answer: ", "a ", "fixed ", "answer."):
+        yield (agent_runner.TOKEN, token)
+
+
+def _ms(step):
+    start = time.perf_counter()
+    step()
+    return (time.perf_counter() - start) * 1000
+
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    agent_runner.WARMUP_ON_START = False
+    agent_runner.ask_agent_stream = _fake_answer
+    with tempfile.TemporaryDirectory() as cwd:
+        os.chdir(cwd)
+        os.makedirs("uploaded_pdfs")
+        for i in range(args.pdfs):
+            with open(os.path.join("uploaded_pdfs", f"report_{i:04d}.pdf"), "wb") as f:
+                f.write(b"%PDF-1.4\n" + os.urandom(1024 + i))
+
+        at = AppTest.from_file(os.path.join(REPO, "app.py"), default_timeout=120)
+        first = _ms(at.run)
+        timings = {"rerun, nothing changed": [], "select a PDF": [], "send a question": [], "clear chat": []}
+        for i in range(args.repeats):
+            timings["rerun, nothing changed"].append(_ms(at.run))
+            select = at.button(key=f"select_report_{i:04d}.pdf")
+            timings["select a PDF"].append(_ms(lambda: select.click().run()))
+            at.text_area(key="message_input").input(f"What does report {i} say?")
+            timings["send a question"].append(_ms(lambda: _button(at, "🚀 Send").click().run()))
+            timings["clear chat"].append(_ms(lambda: _button(at, "🗑️ Clear").click().run()))
+        if at.exception:
+            print(f"app raised: {at.exception[0].value}")
+
+    print(f"PDFs in store: {args.pdfs}  first run (includes agent init): {first:.0f} ms")
+    print(f"{'interaction':>24} {'mean ms':>10} {'min ms':>10}")
+    for name, samples in timings.items():
+        print(f"{name:>24} {statistics.mean(samples):>10.1f} {min(samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_web_agent.py
+"""
+Per-request overhead of the web ReAct agent: rebuilding it with initialize_agent on every
+question (old behaviour) versus one shared agent wrapped in a per-request AgentExecutor.
+
+A fake LLM answers immediately and the search tool is a stub, so the numbers isolate
+construction + orchestration cost from Ollama and DuckDuckGo latency.
+
+    python benchmarks/bench_web_agent.py [--requests 200]
+"""
+import argparse
+import statistics
+import time
+
+from langchain.agents import initialize_agent, AgentType, AgentExecutor
+from langchain.tools import Tool
+from langchain_community.llms.fake import FakeListLLM
+
+ANSWER = "Thought: I know this.\nFinal Answer: 42"
+
+
+def _tool():
+    return Tool.from_function(
+        func=lambda q: "stub result",
+        name="WebSearchTool",
+        description="Searches the web using DuckDuckGo with context from recent chat history to improve relevance.",
+    )
+
+
+def _rebuild_per_request(llm, tool):
+    agent = initialize_agent(
+        tools=[tool],
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        handle_parsing_errors=True,
+        verbose=False,
+    )
+    return agent.invoke({"input": "what is the answer?"})
+
+
+def _shared_agent(llm, tool):
+    shared = initialize_agent(
+        tools=[tool],
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        handle_parsing_errors=True,
+        verbose=False,
+    )
+
+    def run():
+        executor = AgentExecutor(
+            agent=shared.agent,
+            tools=shared.tools,
+            handle_parsing_errors=True,
+            max_iterations=5,
+            max_execution_time=60.0,
+            verbose=False,
+        )
+        return executor.invoke({"input": "what is the answer?"})
+
+    return run
+
+
+def _time(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    llm = FakeListLLM(responses=[ANSWER])
+    tool = _tool()
+    shared_run = _shared_agent(llm, tool)
+
+    # Warm imports and caches for both paths
+    _rebuild_per_request(llm, tool)
+    shared_run()
+
+    before = _time(lambda: _rebuild_per_request(llm, tool), args.requests)
+    after = _time(shared_run, args.requests)
+
+    print(f"requests: {args.requests}")
+    for label, samples in (("rebuild per request", before), ("shared agent", after)):
+        print(
+            f"{label:>20}: mean {statistics.mean(samples):.3f} ms  "
+            f"median {statistics.median(samples):.3f} ms  p95 {sorted(samples)[int(len(samples) * 0.95)]:.3f} ms"
+        )
+    saved = statistics.mean(before) - statistics.mean(after)
+    print(f"{'saved per request':>20}: {saved:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
-from agent.agent_runner import ask_agent
+from agent.agent_runner import apply_event, ask_agent_stream, RETRACT, STATUS
 
 while True:
     user_input = input("You: ")
     if user_input.lower() in ["quit", "exit"]:
         break
 
-    response = ask_agent(user_input)
-    print(f"Bot: {response}")
+    answering = False
+    answer = ""
+    for kind, value in ask_agent_stream(user_input):
+        if kind == STATUS:
+            if not answering:
+                print(f"... {value}", flush=True)
+            continue
+        answer = apply_event(answer, kind, value)
+        if kind == RETRACT:
+            # Printed text cannot be taken back; print the corrected answer so far on a new line
+            print(f"\nBot (revised): {answer}", end="", flush=True)
+            continue
+        if not answering:
+            print("Bot: ", end="", flush=True)
+            answering = True
+        print(value, end="", flush=True)
+    print()
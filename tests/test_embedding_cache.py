@@ -0,0 +1,52 @@
+# tests/test_embedding_cache.py
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from tools.embedding_cache import CachedEmbeddings
+
+
+class _TextEmbeddings(Embeddings):
+    """Distinct, recognisable vector per text; counts calls so cache hits are visible."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        return [float(len(text)), float(ord(text[0])), 1.0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._vector(text)
+
+
+def test_two_instances_on_one_directory_keep_their_rows(tmp_path):
+    a = CachedEmbeddings(_TextEmbeddings(), "model", str(tmp_path))
+    b = CachedEmbeddings(_TextEmbeddings(), "model", str(tmp_path))
+
+    assert a.embed_query("aaa") == [3.0, 97.0, 1.0]
+    assert b.embed_query("bb") == [2.0, 98.0, 1.0]  # b never saw a's append
+    assert a.embed_documents(["cccc", "d"]) == [[4.0, 99.0, 1.0], [1.0, 100.0, 1.0]]
+
+    backend = _TextEmbeddings()
+    fresh = CachedEmbeddings(backend, "model", str(tmp_path))
+    assert fresh.embed_query("aaa") == [3.0, 97.0, 1.0]
+    assert fresh.embed_query("bb") == [2.0, 98.0, 1.0]
+    assert fresh.embed_documents(["cccc", "d"]) == [[4.0, 99.0, 1.0], [1.0, 100.0, 1.0]]
+    assert backend.calls == 0
+
+
+def test_long_lived_reader_sees_rows_appended_by_another_instance(tmp_path):
+    reader_backend = _TextEmbeddings()
+    reader = CachedEmbeddings(reader_backend, "model", str(tmp_path))
+    writer = CachedEmbeddings(_TextEmbeddings(), "model", str(tmp_path))
+
+    writer.embed_query("first")
+    assert reader.embed_query("first") == [5.0, 102.0, 1.0]  # dimension recorded by the writer
+    writer.embed_documents(["second", "third"])
+    assert reader.embed_documents(["second", "third"]) == [[6.0, 115.0, 1.0], [5.0, 116.0, 1.0]]
+    assert reader_backend.calls == 0
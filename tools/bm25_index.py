@@ -0,0 +1,125 @@
+# tools/bm25_index.py
+import os
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.chunk_store import ChunkKey
+
+# Identifiers such as "ERR-0x1F", "ab12.3" or "v2_final" stay one token; their parts are indexed too
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[-_./:]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or that the this to was "
+    "were what when where which who why will with you your does do did can".split()
+)
+_SQL_BATCH = 500
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if _SEPARATORS.search(token):
+            tokens.extend(part for part in _SEPARATORS.split(token) if part and part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over chunks keyed by (doc_id, seq), persisted in SQLite.
+    A document's postings are written in one transaction when it is added; queries read only
+    the posting lists of their own terms, so no model call or full scan is needed.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.k1, self.b = k1, b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, doc_id TEXT NOT NULL, seq INTEGER NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, doc_id, seq)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lengths ("
+            "doc_id TEXT NOT NULL, seq INTEGER NOT NULL, length INTEGER NOT NULL, "
+            "PRIMARY KEY (doc_id, seq)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL)")
+        self._conn.commit()
+        # Corpus statistics are kept in memory; recomputed only here and maintained by add()
+        self._chunks, self._total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM lengths"
+        ).fetchone()
+
+    def has_document(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM lengths WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone() is not None
+
+    def add(self, doc_id: str, texts: List[str]) -> None:
+        """Index one document's chunks in order; a document already indexed is left as is."""
+        postings, lengths, df = [], [], Counter()
+        for seq, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append((doc_id, seq, sum(counts.values())))
+            postings.extend((term, doc_id, seq, tf) for term, tf in counts.items())
+            df.update(counts.keys())
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM lengths WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone():
+                return
+            with self._conn:
+                self._conn.executemany("INSERT INTO postings (term, doc_id, seq, tf) VALUES (?, ?, ?, ?)", postings)
+                self._conn.executemany("INSERT INTO lengths (doc_id, seq, length) VALUES (?, ?, ?)", lengths)
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                    df.items(),
+                )
+            self._chunks += len(lengths)
+            self._total_length += sum(length for _, _, length in lengths)
+
+    def search(self, query: str, k: int = 4, doc_ids: Optional[Iterable[str]] = None) -> List[Tuple[ChunkKey, float]]:
+        """Top-k chunks by BM25 score (higher is better), optionally only within doc_ids."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        doc_filter = list(dict.fromkeys(doc_ids)) if doc_ids is not None else None
+        if doc_filter == []:
+            return []
+        scores: Dict[ChunkKey, float] = defaultdict(float)
+        with self._lock:
+            if not self._chunks:
+                return []
+            n, avg_length = self._chunks, self._total_length / self._chunks
+            for term in terms:
+                row = self._conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                idf = math.log(1 + (n - row[0] + 0.5) / (row[0] + 0.5))
+                for doc_id, seq, tf, length in self._postings(term, doc_filter):
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[(doc_id, seq)] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda hit: hit[1], reverse=True)[:k]
+
+    def _postings(self, term: str, doc_ids: Optional[List[str]]):
+        sql = (
+            "SELECT p.doc_id, p.seq, p.tf, l.length FROM postings p "
+            "JOIN lengths l ON l.doc_id = p.doc_id AND l.seq = p.seq WHERE p.term = ?"
+        )
+        if doc_ids is None:
+            yield from self._conn.execute(sql, (term,))
+            return
+        for i in range(0, len(doc_ids), _SQL_BATCH):
+            batch = doc_ids[i:i + _SQL_BATCH]
+            yield from self._conn.execute(
+                f"{sql} AND p.doc_id IN ({','.join('?' * len(batch))})", [term, *batch]
+            )
@@ -0,0 +1,64 @@
+# tools/chunk_store.py
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+ChunkKey = Tuple[str, int]  # (doc_id, position of the chunk within its document)
+
+
+class ChunkStore:
+    """
+    SQLite table of chunk text and metadata keyed by (doc_id, seq).
+    The vector index holds only vectors; text is read back for the top-k hits alone.
+    """
+
+    _BATCH = 400  # keys per SELECT (two parameters each), below SQLite's bound-parameter limit
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "doc_id TEXT NOT NULL, seq INTEGER NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+            "PRIMARY KEY (doc_id, seq)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def put(self, doc_id: str, texts: List[str], metadatas: List[dict]) -> None:
+        """Store one document's chunks in order; re-putting a document replaces its rows."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT INTO chunks (doc_id, seq, text, metadata) VALUES (?, ?, ?, ?)",
+                [(doc_id, seq, text, json.dumps(meta)) for seq, (text, meta) in enumerate(zip(texts, metadatas))],
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: Iterable[ChunkKey]) -> Dict[ChunkKey, Tuple[str, dict]]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[ChunkKey, Tuple[str, dict]] = {}
+        with self._lock:
+            for i in range(0, len(keys), self._BATCH):
+                batch = keys[i:i + self._BATCH]
+                where = " OR ".join(["(doc_id = ? AND seq = ?)"] * len(batch))
+                params = [value for key in batch for value in key]
+                for doc_id, seq, text, meta in self._conn.execute(
+                    f"SELECT doc_id, seq, text, metadata FROM chunks WHERE {where}", params
+                ):
+                    found[(doc_id, seq)] = (text, json.loads(meta))
+        return found
+
+    def doc_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT doc_id FROM chunks")]
+
+    def texts(self, doc_id: str) -> List[str]:
+        """One document's chunk texts in seq order."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT text FROM chunks WHERE doc_id = ? ORDER BY seq", (doc_id,))]
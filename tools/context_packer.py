@@ -0,0 +1,102 @@
+# tools/context_packer.py
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+TokenCounter = Callable[[str], int]
+
+PIECE_SEPARATOR = "\n\n"  # between non-contiguous pieces of context
+ADJACENT_GAP = 2  # chunks this few characters apart (stripped whitespace) are joined into one piece
+CHARS_PER_TOKEN = 4  # rough ratio for English text, used when no tokenizer is installed
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def build_token_counter(encoding: str = "cl100k_base") -> TokenCounter:
+    """
+    Token counts from tiktoken when it is installed (llama3's BPE vocabulary extends
+    cl100k_base, so counts are close); otherwise a characters-per-token estimate.
+    """
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding(encoding)
+    except Exception:
+        return estimate_tokens
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def _position(doc: Document) -> Optional[Tuple[str, int]]:
+    doc_id, start = doc.metadata.get("doc_id"), doc.metadata.get("start_index")
+    if doc_id is None or start is None:
+        return None
+    return doc_id, start
+
+
+def merge_chunks(docs: List[Document]) -> List[str]:
+    """
+    Context pieces for chunks given in retrieval order: overlapping or adjacent chunks of a
+    document are merged into one span with the repeated text kept once, and spans are ordered
+    by position within their document. Documents keep the order of their best-ranked chunk;
+    chunks without a position (stored before offsets were recorded) follow, duplicates dropped.
+    """
+    spans: Dict[str, List[Tuple[int, str]]] = {}
+    unplaced: List[str] = []
+    for doc in docs:
+        if not doc.page_content:
+            continue
+        position = _position(doc)
+        if position is None:
+            if doc.page_content not in unplaced:
+                unplaced.append(doc.page_content)
+            continue
+        spans.setdefault(position[0], []).append((position[1], doc.page_content))
+
+    pieces = []
+    for chunks in spans.values():
+        chunks.sort()
+        start, text = chunks[0]
+        for next_start, next_text in chunks[1:]:
+            end = start + len(text)
+            if next_start > end + ADJACENT_GAP:
+                pieces.append(text)
+                start, text = next_start, next_text
+            elif next_start > end:
+                text += "\n" * (next_start - end) + next_text
+            elif next_start + len(next_text) > end:
+                text += next_text[end - next_start:]
+        pieces.append(text)
+    return pieces + [text for text in unplaced if not any(text in piece for piece in pieces)]
+
+
+def pack_context(docs: List[Document], token_budget: Optional[int] = None, count_tokens: TokenCounter = estimate_tokens) -> str:
+    """
+    Merge retrieved chunks (see merge_chunks) and keep as many of them as fit in token_budget,
+    best-ranked first. A chunk overlapping one already kept only costs its new text. When not even
+    the best chunk fits, it is cut to the budget so the context is never empty.
+    """
+    docs = [doc for doc in docs if doc.page_content]
+    if token_budget is None or not docs:
+        return PIECE_SEPARATOR.join(merge_chunks(docs))
+
+    counts: Dict[str, int] = {}
+
+    def cost(pieces: List[str]) -> int:
+        for piece in pieces:
+            if piece not in counts:
+                counts[piece] = count_tokens(piece)
+        return sum(counts[piece] for piece in pieces) + len(pieces) - 1  # a separator is about a token
+
+    kept, pieces = [], []
+    for doc in docs:
+        candidate = merge_chunks(kept + [doc])
+        if cost(candidate) <= token_budget:
+            kept.append(doc)
+            pieces = candidate
+    if not kept:
+        text = docs[0].page_content
+        ratio = token_budget / max(1, count_tokens(text))
+        return text[: int(len(text) * ratio)]
+    return PIECE_SEPARATOR.join(pieces)
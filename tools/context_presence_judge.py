@@ -1,12 +1,13 @@
 # tools/context_presence_judge.py
+import threading
+from typing import Optional
+
 from langchain_core.prompts import PromptTemplate
 
-def build_context_presence_checker(llm):
-    """
-    Returns two callables:
-    - check_context_presence(text) -> 'context_provided' | 'context_missing'
-    - judge_context(query, pdf_text) -> 'pdf' | 'web'
-    """
+from tools.fast_router import CONTEXT_MISSING, CONTEXT_PROVIDED, FastRouter
+
+def build_llm_context_judge(llm):
+    """Returns llm_judge(text) -> 'context_provided' | 'context_missing', one LLM call per message."""
 
     prompt = PromptTemplate(
         template=(
@@ -28,14 +29,38 @@ def build_context_presence_checker(llm):
     # New style pipeline: prompt | llm
     chain = prompt | llm
 
-    def check_context_presence(text: str) -> str:
+    def llm_judge(text: str) -> str:
         raw = chain.invoke({"input": text}).strip().lower()
         if "provided" in raw:
-            return "context_provided"
+            return CONTEXT_PROVIDED
         if "missing" in raw:
-            return "context_missing"
+            return CONTEXT_MISSING
         # Fallback is conservative
-        return "context_missing"
+        return CONTEXT_MISSING
+
+    return llm_judge
+
+def build_context_presence_checker(llm, router: Optional[FastRouter] = None):
+    """
+    Returns two callables:
+    - check_context_presence(text) -> 'context_provided' | 'context_missing'
+    - judge_context(query, pdf_text) -> 'pdf' | 'web'
+    check_context_presence asks the local router first and calls the LLM only when it is unsure.
+    Without a router, one is trained on the first check_context_presence call.
+    """
+    routers = [router] if router is not None else []
+    lock = threading.Lock()
+
+    def _router() -> FastRouter:
+        with lock:
+            if not routers:
+                routers.append(FastRouter.from_jsonl(llm_judge=build_llm_context_judge(llm)))
+            return routers[0]
+
+    def check_context_presence(text: str) -> str:
+        label, _ = _router().classify(text)
+        # Greetings and goodbyes can be answered directly
+        return CONTEXT_MISSING if label == CONTEXT_MISSING else CONTEXT_PROVIDED
 
     def judge_context(query: str, pdf_text: str) -> str:
         """
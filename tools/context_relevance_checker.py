@@ -1,6 +1,6 @@
 from langchain.tools import Tool
-import PyPDF2
-import io
+
+from tools.pdf_extract import extract_text
 
 def build_context_relevance_checker(llm):
     """
@@ -22,9 +22,7 @@ def build_context_relevance_checker(llm):
 
         # Extract text from PDF
         try:
-            pdf_stream = io.BytesIO(pdf_bytes)
-            reader = PyPDF2.PdfReader(pdf_stream)
-            pdf_text = "\n".join([page.extract_text() or "" for page in reader.pages])
+            pdf_text = extract_text(pdf_bytes)
         except Exception as e:
             return f"Error reading PDF: {e}"
 
@@ -0,0 +1,86 @@
+# tools/document_catalog.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+
+class DocumentCatalog:
+    """
+    SQLite catalog of ingested PDFs keyed by content hash, with per-document metadata
+    (filename, page count, chunk count, embedding model, ingest time).
+    Lookups and inserts are single indexed statements, committed as they happen.
+    """
+
+    def __init__(self, path: str = ":memory:", legacy_json: Optional[str] = None):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc_hash TEXT PRIMARY KEY, filename TEXT, page_count INTEGER, chunk_count INTEGER, "
+            "embedding_model TEXT, ingested_at REAL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        if legacy_json:
+            self._import_legacy_json(legacy_json)
+
+    def _import_legacy_json(self, path: str) -> None:
+        """One-time import of the processed_pdfs.json hash list; those rows carry no metadata."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE name = 'legacy_json_imported'").fetchone():
+                return
+            hashes = []
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    hashes = data if isinstance(data, list) else []
+                except Exception:
+                    hashes = []
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO documents (doc_hash) VALUES (?)", [(h,) for h in hashes]
+            )
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('legacy_json_imported', ?)", (str(time.time()),))
+            self._conn.commit()
+
+    def __contains__(self, doc_hash: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone() is not None
+
+    def get(self, doc_hash: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def record(
+        self,
+        doc_hash: str,
+        filename: Optional[str] = None,
+        page_count: Optional[int] = None,
+        chunk_count: Optional[int] = None,
+        embedding_model: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(doc_hash, filename, page_count, chunk_count, embedding_model, ingested_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_hash, filename, page_count, chunk_count, embedding_model, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Totals for the sidebar: documents, pages and chunks ingested."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(page_count), 0), COALESCE(SUM(chunk_count), 0) FROM documents"
+            ).fetchone()
+        return {"documents": row[0], "pages": row[1], "chunks": row[2]}
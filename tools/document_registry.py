@@ -0,0 +1,47 @@
+# tools/document_registry.py
+import os
+import mmap
+import hashlib
+import threading
+from typing import Dict, Tuple
+
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+# absolute path -> (size, mtime_ns, content hash); a file is hashed again only when it changes
+_registry: Dict[str, Tuple[int, int, str]] = {}
+_registry_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """
+    MD5 of a file's content, identical to pdf_hash(open(path).read()), computed over a
+    memory map in blocks so the whole file is never copied into Python memory.
+    """
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), HASH_BLOCK_SIZE):
+                digest.update(mapped[start:start + HASH_BLOCK_SIZE])
+    return digest.hexdigest()
+
+
+def resolve_doc_id(path: str) -> str:
+    """Document id (content hash) for a file on disk; a stat() call when the file is unchanged."""
+    stat = os.stat(path)
+    abspath = os.path.abspath(path)
+    with _registry_lock:
+        entry = _registry.get(abspath)
+    if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+        return entry[2]
+    doc_id = file_hash(path)
+    with _registry_lock:
+        _registry[abspath] = (stat.st_size, stat.st_mtime_ns, doc_id)
+    return doc_id
+
+
+def forget(path: str) -> None:
+    """Drop registry entries for a path (e.g. after the file was deleted)."""
+    with _registry_lock:
+        _registry.pop(os.path.abspath(path), None)
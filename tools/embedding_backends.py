@@ -0,0 +1,73 @@
+# tools/embedding_backends.py
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+OLLAMA = "ollama"
+SENTENCE_TRANSFORMERS = "sentence-transformers"
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """In-process sentence encoder; needs the optional `sentence-transformers` package."""
+
+    def __init__(self, model: str, batch_size: int = 32):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The sentence-transformers embedding backend needs `pip install sentence-transformers`"
+            ) from e
+        self._model = SentenceTransformer(model)
+        self._batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(texts, batch_size=self._batch_size, convert_to_numpy=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class TruncatedEmbeddings(Embeddings):
+    """
+    Keep the first `dimensions` components and re-normalize to unit length
+    (Matryoshka-style; meant for models trained for it, e.g. nomic-embed-text v1.5).
+    """
+
+    def __init__(self, embeddings: Embeddings, dimensions: int):
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+
+    def _truncate(self, vectors: List[List[float]]) -> List[List[float]]:
+        cut = np.asarray(vectors, dtype=np.float32)[:, :self.dimensions]
+        norms = np.linalg.norm(cut, axis=1, keepdims=True)
+        return (cut / np.where(norms == 0, 1, norms)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate(self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._truncate([self.embeddings.embed_query(text)])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate(await self.embeddings.aembed_documents(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._truncate([await self.embeddings.aembed_query(text)])[0]
+
+
+def embedding_model_id(backend: str, model: str, dimensions: Optional[int] = None) -> str:
+    """Stable name for what produced a vector, e.g. 'ollama:nomic-embed-text@256'."""
+    return f"{backend}:{model}" + (f"@{dimensions}" if dimensions else "")
+
+
+def build_embeddings(backend: str, model: str, dimensions: Optional[int] = None) -> Embeddings:
+    """Embeddings for the configured backend, optionally truncated to `dimensions`."""
+    if backend == OLLAMA:
+        from tools import ollama_client
+        embeddings: Embeddings = ollama_client.embeddings(model)
+    elif backend == SENTENCE_TRANSFORMERS:
+        embeddings = SentenceTransformerEmbeddings(model)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend!r} (use {OLLAMA!r} or {SENTENCE_TRANSFORMERS!r})")
+    return TruncatedEmbeddings(embeddings, dimensions) if dimensions else embeddings
@@ -0,0 +1,176 @@
+# tools/embedding_cache.py
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SQL_BATCH = 500  # stay under SQLite's bound-parameter limit
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed, disk-backed cache in front of any LangChain Embeddings object.
+
+    Vectors are stored as raw float32 rows appended to `vectors.f32` (read back through a
+    memory map) and located through a SQLite index keyed by hash(model, kind, text).
+    Rows are written before their index entries, so a crash can only leave unreferenced
+    rows behind, never an index entry pointing at a partial vector. Appends take an exclusive
+    lock on `vectors.lock`, so several processes can share one cache directory.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_dir: str):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        os.makedirs(self._dir, exist_ok=True)
+        self._vectors_path = os.path.join(self._dir, "vectors.f32")
+        self._lock_path = os.path.join(self._dir, "vectors.lock")
+        self._conn = sqlite3.connect(os.path.join(self._dir, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.commit()
+        self._dim: Optional[int] = self._stored_dim()
+        self._mmap: Optional[np.memmap] = None
+
+    # ------------------------
+    # Embeddings interface
+    # ------------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("doc", t) for t in texts]
+        found = self._lookup(keys)
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            found.update(self._store(list(missing.keys()), vectors))
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        found = self._lookup([key])
+        if key not in found:
+            found.update(self._store([key], [self.embeddings.embed_query(text)]))
+        return found[key]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("doc", t) for t in texts]
+        found = self._lookup(keys)
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            found.update(self._store(list(missing.keys()), vectors))
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        found = self._lookup([key])
+        if key not in found:
+            found.update(self._store([key], [await self.embeddings.aembed_query(text)]))
+        return found[key]
+
+    # ------------------------
+    # Storage
+    # ------------------------
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x1f{kind}\x1f{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _missing(keys: List[str], texts: List[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        """Texts to embed, de-duplicated and in first-seen order."""
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return missing
+
+    def _stored_dim(self) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process using this cache directory."""
+        with open(self._lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _vectors(self, needed_rows: int) -> np.memmap:
+        """Memory map of the vector file, remapped when another writer has appended past it."""
+        if self._mmap is None or self._mmap.shape[0] < needed_rows:
+            rows = os.path.getsize(self._vectors_path) // (self._dim * 4)
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._mmap
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            if self._dim is None:
+                self._dim = self._stored_dim()  # another process may have stored the first vectors
+                if self._dim is None:
+                    return {}
+            rows: Dict[str, int] = {}
+            for i in range(0, len(unique), _SQL_BATCH):
+                batch = unique[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(self._conn.execute(
+                    f"SELECT key, row FROM rows WHERE key IN ({placeholders})", batch
+                ).fetchall())
+            if not rows:
+                return {}
+            vectors = self._vectors(max(rows.values()) + 1)
+            return {key: vectors[row].tolist() for key, row in rows.items()}
+
+    def _store(self, keys: List[str], vectors: List[List[float]]) -> Dict[str, List[float]]:
+        arr = np.asarray(vectors, dtype=np.float32)
+        if arr.ndim != 2 or arr.shape[0] != len(keys):
+            raise ValueError(f"Expected {len(keys)} embeddings, got array of shape {arr.shape}")
+        with self._lock, self._file_lock():
+            self._dim = self._stored_dim()
+            if self._dim is None:
+                self._dim = int(arr.shape[1])
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self._dim),))
+                self._conn.commit()
+            elif arr.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension changed for model {self.model_name!r}: cached {self._dim}, got {arr.shape[1]}"
+                )
+            # Row ids come from the file itself: other processes may have appended since we last looked
+            row_bytes = self._dim * 4
+            with open(self._vectors_path, "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size % row_bytes:
+                    f.truncate(size - size % row_bytes)  # partial row left by a crash mid-append
+                start = size // row_bytes
+                f.write(arr.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (key, row) VALUES (?, ?)",
+                [(key, start + i) for i, key in enumerate(keys)],
+            )
+            self._conn.commit()
+        return {key: arr[i].tolist() for i, key in enumerate(keys)}
@@ -0,0 +1,175 @@
+# tools/fast_router.py
+import os
+import re
+import json
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.ttl_cache import TTLCache
+
+# Labeled messages shipped with the repo; the classifier is trained from them on first use
+ROUTER_TRAIN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "router", "train.jsonl")
+
+GREETING = "greeting"
+GOODBYE = "goodbye"
+CONTEXT_PROVIDED = "context_provided"
+CONTEXT_MISSING = "context_missing"
+LABELS = (GREETING, GOODBYE, CONTEXT_PROVIDED, CONTEXT_MISSING)
+
+# Where a decision came from, reported alongside the label
+RULE, MODEL, LLM, MEMO = "rule", "model", "llm", "memo"
+MEMO_TTL = 24 * 3600.0
+
+_GREETING_RULE = re.compile(
+    r"^(hi+|hello+|hey+|hiya|howdy|yo|greetings|good (morning|afternoon|evening|day))"
+    r"( there| all| everyone| bot| friend)?[\s!.,:)]*$"
+)
+_GOODBYE_RULE = re.compile(
+    r"^((ok(ay)?|thanks|thank you)[,!. ]+)?(bye+( bye)?|goodbye|good night|see (you|ya)( later| soon| tomorrow)?"
+    r"|take care|cya|farewell|later|talk (to you )?later)[\s!.,:)]*$"
+)
+_WORD = re.compile(r"[a-z0-9']+")
+_SENTENCE_END = re.compile(r"[.!?]+(\s|$)")
+
+
+def normalize_message(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def match_rules(text: str) -> Optional[str]:
+    """GREETING or GOODBYE when the whole message is plain small talk, else None."""
+    key = normalize_message(text)
+    if _GREETING_RULE.match(key):
+        return GREETING
+    if _GOODBYE_RULE.match(key):
+        return GOODBYE
+    return None
+
+
+def _bucket(value: int, edges: Sequence[int]) -> int:
+    return sum(value > edge for edge in edges)
+
+
+class HashedNgramClassifier:
+    """
+    Multinomial logistic regression over hashed features: word unigrams and bigrams,
+    character trigrams, and coarse shape features (length, sentences, question mark).
+    Trained with plain SGD in numpy; a few hundred examples train in well under a second.
+    """
+
+    def __init__(self, labels: Sequence[str] = LABELS, dim: int = 1 << 16):
+        self.labels = list(labels)
+        self.dim = dim
+        self.weights = np.zeros((dim, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(distinct hashed feature ids, their counts)."""
+        text = normalize_message(text)
+        words = _WORD.findall(text)
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {text} "
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        features += [
+            f"len:{_bucket(len(words), (2, 5, 10, 20, 40))}",
+            f"sent:{_bucket(len(_SENTENCE_END.findall(text)), (1, 2, 3))}",
+            f"q:{'?' in text}",
+            f"first:{words[0] if words else ''}",
+        ]
+        ids = np.fromiter((zlib.crc32(f.encode("utf-8")) % self.dim for f in features), dtype=np.int64)
+        idx, counts = np.unique(ids, return_counts=True)
+        return idx, counts.astype(np.float32)[:, None]
+
+    def _scores(self, features: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        idx, counts = features
+        logits = (self.weights[idx] * counts).sum(axis=0) + self.bias
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def fit(self, texts: List[str], labels: List[str], epochs: int = 30, lr: float = 0.5, l2: float = 1e-4, seed: int = 0):
+        rows = [self._features(t) for t in texts]
+        targets = np.eye(len(self.labels), dtype=np.float32)[[self.labels.index(label) for label in labels]]
+        order = np.arange(len(rows))
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            step = lr / (1 + epoch * 0.1)
+            for i in order:
+                idx, counts = rows[i]
+                grad = (self._scores(rows[i]) - targets[i]) / np.sqrt(counts.sum())
+                self.weights[idx] -= step * counts * grad
+                self.bias -= step * grad
+            self.weights *= 1 - l2
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        return dict(zip(self.labels, self._scores(self._features(text)).tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probs = self.predict_proba(text)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+
+def load_examples(path: str) -> Tuple[List[str], List[str]]:
+    """Labeled messages from a jsonl file of {"text": ..., "label": ...} lines."""
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"])
+                labels.append(example["label"])
+    return texts, labels
+
+
+class FastRouter:
+    """
+    Classifies a message as greeting / goodbye / context_provided / context_missing:
+    exact rules first, then the classifier, and only below `threshold` confidence the
+    optional LLM judge (which answers context_provided / context_missing).
+    Decisions are memoized per normalized message.
+    """
+
+    def __init__(
+        self,
+        classifier: HashedNgramClassifier,
+        llm_judge: Optional[Callable[[str], str]] = None,
+        threshold: float = 0.8,
+        memo_size: int = 4096,
+    ):
+        self.classifier = classifier
+        self.llm_judge = llm_judge
+        self.threshold = threshold
+        self._memo = TTLCache(max_memory_entries=memo_size)
+
+    @classmethod
+    def from_jsonl(cls, path: str = ROUTER_TRAIN_FILE, **kwargs) -> "FastRouter":
+        texts, labels = load_examples(path)
+        return cls(HashedNgramClassifier().fit(texts, labels), **kwargs)
+
+    def classify(self, text: str) -> Tuple[str, str]:
+        """Returns (label, source); source is one of rule / model / llm / memo."""
+        key = normalize_message(text)
+        label = self._memo.get(key)
+        if label is not None:
+            return label, MEMO
+        label, source = self._decide(key, text)
+        self._memo.set(key, label, MEMO_TTL)
+        return label, source
+
+    def _decide(self, key: str, text: str) -> Tuple[str, str]:
+        rule = match_rules(key)
+        if rule is not None:
+            return rule, RULE
+        label, confidence = self.classifier.predict(key)
+        if confidence >= self.threshold:
+            return label, MODEL
+        if self.llm_judge is not None:
+            return self.llm_judge(text), LLM
+        # Unsure and no judge: never short-circuit a real question as small talk
+        return (CONTEXT_MISSING if label in (GREETING, GOODBYE) else label), MODEL
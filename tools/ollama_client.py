@@ -0,0 +1,77 @@
+# tools/ollama_client.py
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+from ollama import AsyncClient, Client
+from langchain_ollama import OllamaEmbeddings, OllamaLLM
+
+# Seconds Ollama keeps a model loaded after its last request (its default is 5 minutes);
+# -1 keeps it loaded until the server stops
+OLLAMA_KEEP_ALIVE = 30 * 60
+OLLAMA_HOST: Optional[str] = None  # None: the ollama package default (OLLAMA_HOST env or localhost:11434)
+OLLAMA_MAX_CONNECTIONS = 8
+OLLAMA_KEEPALIVE_CONNECTIONS = 4  # idle HTTP connections kept open for reuse
+
+_clients: Optional[Tuple[Client, AsyncClient]] = None
+_clients_lock = threading.Lock()
+
+
+def shared_clients() -> Tuple[Client, AsyncClient]:
+    """The process-wide sync and async Ollama clients, each with one pooled HTTP connection pool."""
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            limits = httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_KEEPALIVE_CONNECTIONS
+            )
+            _clients = Client(host=OLLAMA_HOST, limits=limits), AsyncClient(host=OLLAMA_HOST, limits=limits)
+        return _clients
+
+
+def _share(model):
+    # langchain_ollama builds private clients per object; point them at the shared pair instead
+    model._client, model._async_client = shared_clients()
+    return model
+
+
+def chat_llm(model: str, **kwargs) -> OllamaLLM:
+    return _share(OllamaLLM(model=model, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE, **kwargs))
+
+
+def embeddings(model: str, **kwargs) -> OllamaEmbeddings:
+    return _share(OllamaEmbeddings(model=model, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE, **kwargs))
+
+
+def warmup(chat_models: Iterable[str] = (), embedding_models: Iterable[str] = ()) -> Dict[str, float]:
+    """
+    Load the models into Ollama's memory ahead of the first question (an empty generate or
+    embed request only loads the model). Returns seconds taken per model; models that could
+    not be loaded (server down, model not pulled) are left out.
+    """
+    client, _ = shared_clients()
+    timings = {}
+    for model in chat_models:
+        start = time.perf_counter()
+        try:
+            client.generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+            timings[model] = time.perf_counter() - start
+        except Exception:
+            pass
+    for model in embedding_models:
+        start = time.perf_counter()
+        try:
+            client.embed(model=model, input="", keep_alive=OLLAMA_KEEP_ALIVE)
+            timings[model] = time.perf_counter() - start
+        except Exception:
+            pass
+    return timings
+
+
+def warmup_in_background(chat_models: Iterable[str] = (), embedding_models: Iterable[str] = ()) -> threading.Thread:
+    thread = threading.Thread(
+        target=warmup, args=(list(chat_models), list(embedding_models)), daemon=True, name="ollama-warmup"
+    )
+    thread.start()
+    return thread
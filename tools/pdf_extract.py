@@ -0,0 +1,59 @@
+# tools/pdf_extract.py
+# Kept free of LangChain/FAISS imports: worker processes import this module when they start.
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from PyPDF2 import PdfReader
+
+# Below this many pages, process start-up costs more than it saves
+PARALLEL_EXTRACT_MIN_PAGES = 32
+EXTRACT_MAX_WORKERS = os.cpu_count() or 1
+# Never fork: the app process runs Streamlit, Ollama client and FAISS threads whose locks a
+# forked child would inherit mid-use. forkserver where the platform has it, else spawn
+EXTRACT_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _extract_range(reader: PdfReader, start: int, end: int) -> List[Tuple[int, str]]:
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _extract_file_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker entry point: each process parses the PDF itself and extracts pages [start, end)."""
+    with open(path, "rb") as f:
+        return _extract_range(PdfReader(f), start, end)
+
+
+def extract_pages(pdf_bytes: bytes) -> List[Tuple[int, str]]:
+    """
+    Extract text per page as (page_number, text), 1-based and in document order.
+    Large PDFs are split into page ranges across a process pool; small ones are read serially.
+    """
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    workers = min(EXTRACT_MAX_WORKERS, page_count // max(1, PARALLEL_EXTRACT_MIN_PAGES // 2))
+    if page_count < PARALLEL_EXTRACT_MIN_PAGES or workers < 2:
+        return _extract_range(reader, 0, page_count)
+
+    # Hand workers a file path rather than pickling the whole PDF into every task
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        step = -(-page_count // (workers * 2))  # two ranges per worker for load balance
+        starts = list(range(0, page_count, step))
+        ends = [min(s + step, page_count) for s in starts]
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context(EXTRACT_START_METHOD)
+        ) as pool:
+            ranges = pool.map(_extract_file_range, [path] * len(starts), starts, ends)
+            return [page for chunk in ranges for page in chunk]
+    finally:
+        os.remove(path)
+
+
+def extract_text(pdf_bytes: bytes) -> str:
+    return "\n".join(text for _, text in extract_pages(pdf_bytes))
@@ -1,88 +1,371 @@
 # tools/pdf_relevance_checker.py
-import io
+import os
+import re
+import asyncio
+import bisect
+import time
 import hashlib
-from typing import List, Callable, Optional
-from langchain_community.vectorstores import FAISS
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Callable, Optional, Tuple
 # from langchain_community.embeddings import OllamaEmbeddings
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
 
 from langchain.docstore.document import Document
-from PyPDF2 import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from tools.bm25_index import BM25Index
+from tools.chunk_store import ChunkKey
+from tools.context_packer import TokenCounter, build_token_counter, pack_context
+from tools.document_catalog import DocumentCatalog
+from tools.embedding_backends import OLLAMA, build_embeddings, embedding_model_id
+from tools.embedding_cache import CachedEmbeddings
+from tools.pdf_extract import extract_pages
+from tools.segment_store import EmbeddingModelMismatch, SegmentedFAISS, stored_embedding_model
+
+# A dedicated embedding model: nomic-embed-text gives 768-dim vectors at a fraction of llama3's
+# cost (4096 dims through the full chat model). Backends: "ollama" or "sentence-transformers"
+# (in-process, e.g. "all-MiniLM-L6-v2"). EMBEDDING_DIMENSIONS keeps only the leading components,
+# for Matryoshka-trained models. Changing any of these needs a fresh vector store.
+EMBEDDING_BACKEND = OLLAMA
+EMBEDDING_MODEL = "nomic-embed-text"
+EMBEDDING_DIMENSIONS: Optional[int] = None
+EMBEDDING_MODEL_ID = embedding_model_id(EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+EMBEDDING_CACHE_DIR = "embedding_cache"
+
+# Ingestion: chunks are embedded in batches on a bounded pool; failed batches are retried
+# with exponential backoff. Finished batches land in the embedding cache immediately,
+# so a crashed ingest resumes where it stopped.
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_WORKERS = 4
+EMBED_MAX_RETRIES = 3
+EMBED_RETRY_BACKOFF = 1.0  # seconds, doubled after each failed attempt
+
+DEFAULT_VECTORSTORE_DIR = "vector_store"
+# Per-document segments are merged into the base in the background once this many accumulate
+COMPACT_THRESHOLD = 16
+# faiss factory string for the compacted base: "Flat" (exact), "HNSW32", "IVF1024,Flat",
+# "IVF1024,PQ64", "SQfp16", "SQ8", ... but no pre-transform (PCA, OPQ, ...): its distances
+# would not be comparable with the segments'. Indexes that need training stay Flat until the
+# corpus holds INDEX_MIN_TRAIN_POINTS vectors (and 39 per IVF list); an existing flat
+# base is rebuilt with this factory in the background on the next start.
+INDEX_FACTORY = "Flat"
+INDEX_MIN_TRAIN_POINTS = 10_000
+INDEX_NPROBE = 16  # IVF lists visited per query
+INDEX_EF_SEARCH = 64  # HNSW candidate list size per query
+
+# Retrieval: "lexical" (BM25 only, no model call), "vector" (FAISS only), "hybrid" (both,
+# fused by reciprocal rank) or "auto": queries made up only of identifiers (part numbers,
+# error codes, file names) try lexical first and fall back to hybrid when nothing matches;
+# any other query is hybrid.
+LEXICAL, VECTOR, HYBRID, AUTO = "lexical", "vector", "hybrid", "auto"
+RETRIEVAL_MODE = AUTO
+HYBRID_CANDIDATES = 20  # hits taken from each ranking before fusion
+RRF_K = 60
+LEXICAL_INDEX_FILE = "lexical.sqlite"  # inside the vector store directory
+
+# Retrieved chunks overlap by up to 200 characters; they are merged by position and packed into
+# this many tokens (None: no limit) before they go into the prompt
+CONTEXT_TOKEN_BUDGET: Optional[int] = 1536
+
 # Module-level singletons owned here
-_embeddings = OllamaEmbeddings(model="llama3")
-_vector_store: Optional[FAISS] = None
+# Chunk and query embeddings are cached on disk, so rebuilds and repeated queries skip Ollama.
+# Built on first use, so importing this module creates no files and no clients
+_embeddings: Optional[CachedEmbeddings] = None
+_embeddings_lock = threading.Lock()
+# Built on first use: tiktoken may download its BPE file, which must not happen at import
+_count_tokens: Optional[TokenCounter] = None
+_vector_store: Optional[SegmentedFAISS] = None
+_lexical_index: Optional[BM25Index] = None
+# Serializes ingestion so a PDF is never added twice; searches are guarded inside SegmentedFAISS
+_store_lock = threading.RLock()
 
-# Persistent cache (hashes) injected by agent_runner
-_processed_hashes = set()
-_flush_callback: Optional[Callable[[set], None]] = None
+# Persistent document catalog injected by agent_runner
+_catalog = DocumentCatalog()
 _vectorstore_dir: Optional[str] = None
+_store_error: Optional[str] = None  # why the store could not be opened, if it could not
+
+def attach_persistent_cache(catalog: DocumentCatalog):
+    """Attach the persistent document catalog that records which PDFs were ingested."""
+    global _catalog
+    _catalog = catalog
+
+def catalog_stats() -> dict:
+    """Documents / pages / chunks ingested, straight from the catalog."""
+    return _catalog.stats()
+
+def _new_store(vectorstore_dir: str) -> SegmentedFAISS:
+    return SegmentedFAISS(
+        vectorstore_dir,
+        embedding_model=EMBEDDING_MODEL_ID,
+        compact_threshold=COMPACT_THRESHOLD,
+        index_factory=INDEX_FACTORY,
+        min_train_points=INDEX_MIN_TRAIN_POINTS,
+        nprobe=INDEX_NPROBE,
+        ef_search=INDEX_EF_SEARCH,
+    )
 
-def attach_persistent_cache(cache_set: set, on_flush: Optional[Callable[[set], None]] = None):
-    """Attach a persistent cache (set of pdf hashes) and an optional flush callback to save it."""
-    global _processed_hashes, _flush_callback
-    _processed_hashes = cache_set
-    _flush_callback = on_flush
+def _backfill_lexical(store: SegmentedFAISS, lexical: BM25Index):
+    """Index chunks stored before the lexical index existed; runs once, in the background."""
+    try:
+        for doc_id in store.chunks.doc_ids():
+            if not lexical.has_document(doc_id):
+                lexical.add(doc_id, store.chunks.texts(doc_id))
+    except Exception:
+        pass  # missing documents are retried on the next start
+
+def _model_store_dir(vectorstore_dir: str) -> str:
+    """
+    Where the store for EMBEDDING_MODEL_ID lives: vectorstore_dir itself when it was built with
+    that model (or is still empty), else vectorstore_dir/<model id>/. Switching models therefore
+    re-indexes into a fresh directory and switching back finds the old store intact.
+    """
+    built_with = stored_embedding_model(vectorstore_dir)
+    if built_with is None or built_with == EMBEDDING_MODEL_ID:
+        return vectorstore_dir
+    return os.path.join(vectorstore_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", EMBEDDING_MODEL_ID))
 
 def ensure_vectorstore_ready(vectorstore_dir: str):
-    """Load or initialize the FAISS store once and remember where to save."""
-    global _vector_store, _vectorstore_dir
+    """Load or initialize the FAISS store and its lexical index once and remember where to save."""
+    global _vector_store, _lexical_index, _vectorstore_dir, _store_error
     _vectorstore_dir = vectorstore_dir
+    store_dir = _model_store_dir(vectorstore_dir)
+    store = _new_store(store_dir)
     try:
-        _vector_store = FAISS.load_local(_vectorstore_dir, _embeddings, allow_dangerous_deserialization=True)
+        store.load()
+    except EmbeddingModelMismatch as e:
+        # Never fall back to an empty store that would mix models in the same directory;
+        # PDF retrieval stays off and ingestion reports why
+        with _store_lock:
+            _vector_store, _lexical_index, _store_error = None, None, f"PDF retrieval disabled: {e}"
+        return
     except Exception:
-        _vector_store = None  # created on first add
+        store = _new_store(store_dir)
+    lexical = BM25Index(os.path.join(store_dir, LEXICAL_INDEX_FILE))
+    with _store_lock:
+        _vector_store, _lexical_index, _store_error = store, lexical, None
+    threading.Thread(target=_backfill_lexical, args=(store, lexical), daemon=True).start()
 
-def _save_vectorstore():
-    if _vector_store is not None and _vectorstore_dir:
-        _vector_store.save_local(_vectorstore_dir)
+def _get_embeddings() -> CachedEmbeddings:
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = CachedEmbeddings(
+                build_embeddings(EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS),
+                EMBEDDING_MODEL_ID,
+                EMBEDDING_CACHE_DIR,
+            )
+        return _embeddings
 
-def _pdf_hash(pdf_bytes: bytes) -> str:
+def pdf_hash(pdf_bytes: bytes) -> str:
+    """Content hash identifying a PDF in the persistent cache and vector store."""
     return hashlib.md5(pdf_bytes).hexdigest()
 
-def _extract_text(pdf_bytes: bytes) -> str:
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    return "\n".join((page.extract_text() or "") for page in reader.pages)
+def _chunk_pages(pages: List[Tuple[int, str]]) -> List[Document]:
+    """
+    Chunk the joined page texts exactly as before, tagging each chunk with the page
+    it starts on and its character offset in the joined text.
+    """
+    text = "\n".join(page_text for _, page_text in pages)
+    page_starts, offset = [], 0
+    for _, page_text in pages:
+        page_starts.append(offset)
+        offset += len(page_text) + 1
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    docs = splitter.create_documents([text])
+    for doc in docs:
+        start = doc.metadata.get("start_index", 0)
+        doc.metadata["page"] = pages[bisect.bisect_right(page_starts, start) - 1][0] if pages else 1
+    return docs
 
-def _chunk_text(text: str) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_text(text)
-    return [Document(page_content=ch) for ch in chunks]
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            return _get_embeddings().embed_documents(texts)
+        except Exception:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            time.sleep(EMBED_RETRY_BACKOFF * (2 ** attempt))
 
-def add_pdf_if_new(pdf_bytes: bytes, vectorstore_dir: Optional[str] = None):
+def _embed_chunks(
+    texts: List[str],
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    batch_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[List[float]]:
+    """Embed texts in batches on a bounded thread pool; on_progress(done, total) after each batch."""
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results: List[Optional[List[List[float]]]] = [None] * len(batches)
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers or EMBED_MAX_WORKERS) as pool:
+        futures = {pool.submit(_embed_batch, batch): i for i, batch in enumerate(batches)}
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += len(batches[i])
+                if on_progress:
+                    on_progress(done, len(texts))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return [vector for batch in results for vector in batch]
+
+def is_ingested(doc_hash: str) -> bool:
+    """True once the PDF with this pdf_hash is searchable in the vector store."""
+    entry = _catalog.get(doc_hash)
+    if entry is None:
+        return False
+    if entry["chunk_count"] == 0:
+        return True  # no extractable text: nothing to search, nothing to redo
+    # The vector store is the source of truth: hashes imported from the legacy list, chunks
+    # stored before they carried doc_id, a store that was moved away or one built with another
+    # embedding model (see _model_store_dir) are all ingested again
+    return _vector_store is not None and _vector_store.has_document(doc_hash)
+
+def add_pdf_if_new(
+    pdf_bytes: bytes,
+    vectorstore_dir: Optional[str] = None,
+    doc_hash: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+    filename: Optional[str] = None,
+):
     """
     Idempotently add a PDF to FAISS if not seen before.
-    Uses persistent hash cache if attached.
+    Records it in the attached document catalog. Pass doc_hash when the caller already computed pdf_hash.
+    on_stage("extracting" | "embedding") and on_progress(done, total) report ingestion progress.
     """
-    global _vector_store
-    h = _pdf_hash(pdf_bytes)
-    if h in _processed_hashes:
+    h = doc_hash or pdf_hash(pdf_bytes)
+    if is_ingested(h):
         return
 
     # Extract and embed
-    text = _extract_text(pdf_bytes)
-    docs = _chunk_text(text)
-
-    if _vector_store is None:
-        _vector_store = FAISS.from_documents(docs, _embeddings)
-    else:
-        _vector_store.add_documents(docs)
+    if on_stage:
+        on_stage("extracting")
+    pages = extract_pages(pdf_bytes)
+    docs = _chunk_pages(pages)
+    for doc in docs:
+        doc.metadata["doc_id"] = h
+    if on_stage:
+        on_stage("embedding")
+    texts = [d.page_content for d in docs]
+    # Embed outside the lock so concurrent searches are not blocked by ingestion
+    text_embeddings = list(zip(texts, _embed_chunks(texts, on_progress)))
+    metadatas = [d.metadata for d in docs]
 
     # Persist artifacts
-    if vectorstore_dir is not None:
+    if vectorstore_dir is not None and vectorstore_dir != _vectorstore_dir:
         # allow override; else default to configured dir
-        global _vectorstore_dir
-        _vectorstore_dir = vectorstore_dir
+        ensure_vectorstore_ready(vectorstore_dir)
+
+    with _store_lock:
+        if is_ingested(h):
+            return  # ingested by a concurrent caller meanwhile
+
+        if _vector_store is None:
+            ensure_vectorstore_ready(_vectorstore_dir or DEFAULT_VECTORSTORE_DIR)
+        if _vector_store is None:
+            raise RuntimeError(_store_error)
+        if text_embeddings:
+            # Writes only this document's segment and the manifest, not the whole store
+            _vector_store.add(h, text_embeddings, metadatas)
+            _lexical_index.add(h, texts)
+
+        _catalog.record(
+            h,
+            filename=filename,
+            page_count=len(pages),
+            chunk_count=len(docs),
+            embedding_model=EMBEDDING_MODEL_ID,
+        )
+
+def retrieve_relevant_context(
+    query: str,
+    k: int = 4,
+    doc_ids: Optional[List[str]] = None,
+    mode: Optional[str] = None,
+    token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """
+    Top-k retrieval (see RETRIEVAL_MODE); empty string if store not ready or nothing found.
+    With doc_ids (pdf_hash values), only chunks of those documents are searched.
+    Lexical answers need no embedding call. The chunks are packed into token_budget tokens.
+    """
+    if _vector_store is None or _vector_store.is_empty():
+        return ""
+    final, lexical = _lexical_stage(query, k, doc_ids, mode)
+    if final is None:
+        final = _vector_stage(_get_embeddings().embed_query(query), k, doc_ids, lexical)
+    return _format_chunks(final, token_budget)
+
+async def aretrieve_relevant_context(
+    query: str,
+    k: int = 4,
+    doc_ids: Optional[List[str]] = None,
+    mode: Optional[str] = None,
+    token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """Async retrieve_relevant_context: embeds via the async Ollama client, searches in an executor."""
+    if _vector_store is None or _vector_store.is_empty():
+        return ""
+    loop = asyncio.get_running_loop()
+    final, lexical = await loop.run_in_executor(None, _lexical_stage, query, k, doc_ids, mode)
+    if final is None:
+        embedding = await _get_embeddings().aembed_query(query)
+        final = await loop.run_in_executor(None, _vector_stage, embedding, k, doc_ids, lexical)
+    return await loop.run_in_executor(None, _format_chunks, final, token_budget)
+
+# Letters and digits mixed ("A1234", "0x1F") or joined by separators ("ERR-42", "v2_final")
+_IDENTIFIER = re.compile(r"(?=\w*[A-Za-z])(?=\w*\d)\w+|\w+(?:[-_./:]\w+)+")
+
+def _is_keyword_query(query: str) -> bool:
+    """Queries consisting only of identifiers; plain words, years or acronyms need the vector search."""
+    words = [w for w in (w.strip("?.,!;:\"'()[]") for w in query.split()) if w]
+    return bool(words) and all(_IDENTIFIER.fullmatch(w) for w in words)
+
+def _lexical_stage(
+    query: str, k: int, doc_ids: Optional[List[str]], mode: Optional[str]
+) -> Tuple[Optional[List[ChunkKey]], List[ChunkKey]]:
+    """(final chunk keys when BM25 alone answers, else BM25 ranking to fuse with vector hits)."""
+    mode = mode or RETRIEVAL_MODE
+    fallback = mode == AUTO
+    if fallback:
+        mode = LEXICAL if _is_keyword_query(query) else HYBRID
+    if mode == VECTOR or _lexical_index is None:
+        return None, []
+    keys = [key for key, _ in _lexical_index.search(query, k if mode == LEXICAL else HYBRID_CANDIDATES, doc_ids)]
+    if mode == LEXICAL and (keys or not fallback):
+        return keys, []
+    return None, keys
+
+def _vector_stage(
+    embedding: List[float], k: int, doc_ids: Optional[List[str]], lexical: List[ChunkKey]
+) -> List[ChunkKey]:
+    if not lexical:
+        return [key for key, _ in _vector_store.search_keys(embedding, k, doc_ids)]
+    vector = [key for key, _ in _vector_store.search_keys(embedding, HYBRID_CANDIDATES, doc_ids)]
+    return _reciprocal_rank_fusion([lexical, vector])[:k]
+
+def _reciprocal_rank_fusion(rankings: List[List[ChunkKey]]) -> List[ChunkKey]:
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
 
-    _save_vectorstore()
-    _processed_hashes.add(h)
-    if _flush_callback:
-        _flush_callback(_processed_hashes)
+def _token_counter() -> TokenCounter:
+    global _count_tokens
+    if _count_tokens is None:
+        _count_tokens = build_token_counter()  # a concurrent first call at worst builds it twice
+    return _count_tokens
 
-def retrieve_relevant_context(query: str, k: int = 4) -> str:
-    """Top-k semantic retrieval from FAISS; empty string if store not ready or nothing found."""
-    if _vector_store is None:
+def _format_chunks(keys: List[ChunkKey], token_budget: Optional[int] = None) -> str:
+    if _vector_store is None or not keys:
         return ""
-    results = _vector_store.similarity_search(query, k=k)
-    return "\n".join(doc.page_content for doc in results if doc and doc.page_content)
+    if token_budget is None:
+        return pack_context(_vector_store.documents(keys))
+    return pack_context(_vector_store.documents(keys), token_budget, _token_counter())
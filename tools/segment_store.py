@@ -0,0 +1,451 @@
+# tools/segment_store.py
+import os
+import re
+import json
+import time
+import pickle
+import bisect
+import threading
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from tools.chunk_store import ChunkKey, ChunkStore
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 2
+CHUNKS_FILE = "chunks.sqlite"
+LEGACY_INDEX_NAME = "index"  # what FAISS.save_local wrote before segments existed
+SEGMENT_PREFIX = "seg-"
+UNTAGGED_PREFIX = "untagged:"  # doc_id given to legacy chunks ingested before doc tagging
+LEGACY_EMBEDDING_MODEL = "ollama:llama3"  # what built stores whose manifest names no model
+
+# Map index files instead of reading them: load cost and resident memory no longer grow with the corpus.
+# Older faiss builds lack IO_FLAG_MMAP_IFC; their IO_FLAG_MMAP does not map Flat indexes
+_MMAP_IFC = hasattr(faiss, "IO_FLAG_MMAP_IFC")
+_MMAP_FLAGS = (faiss.IO_FLAG_MMAP_IFC if _MMAP_IFC else faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+_warned_no_mmap = False
+_RECONSTRUCT_BLOCK = 4096  # rows copied at a time while compacting
+
+FLAT_FACTORY = "Flat"
+# Factory prefixes that transform vectors before indexing (PCA, OPQ, random rotation, ...):
+# such a base reports distances in another space than the Flat segments it is merged with
+_PRETRANSFORM = re.compile(r"(PCA|OPQ|RR|L2norm|ITQ|Pad)")
+TRAIN_POINTS_PER_CENTROID = 39  # below this faiss warns that k-means is under-trained
+
+
+class EmbeddingModelMismatch(RuntimeError):
+    """The store on disk was built by a different embedding model than the one configured."""
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def stored_embedding_model(directory: str) -> Optional[str]:
+    """Embedding model the store in directory was built with; None if it holds no vectors yet."""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    elif os.path.exists(os.path.join(directory, f"{LEGACY_INDEX_NAME}.faiss")):
+        manifest = {"base": LEGACY_INDEX_NAME}
+    else:
+        return None
+    if not (manifest.get("base") or manifest.get("segments")):
+        return None
+    return manifest.get("embedding_model", LEGACY_EMBEDDING_MODEL)
+
+
+def _segment_doc_id(name: str) -> str:
+    return name[len(SEGMENT_PREFIX):]
+
+
+def _runs_by_doc(runs: List[list]) -> Dict[str, List[Tuple[int, int]]]:
+    """doc_id -> (first_row, count) in the base, from the manifest's [doc_id, first_row, count, first_seq] runs."""
+    by_doc: Dict[str, List[Tuple[int, int]]] = {}
+    for doc_id, start, count, _ in runs:
+        if not doc_id.startswith(UNTAGGED_PREFIX):
+            by_doc.setdefault(doc_id, []).append((start, count))
+    return by_doc
+
+
+def _search_rows(index: faiss.Index, query: np.ndarray, k: int, runs: List[Tuple[int, int]]) -> List[Tuple[int, float]]:
+    """Exact search restricted to the rows of the given runs; cost scales with those rows, not the store."""
+    ids = np.concatenate([np.arange(start, start + count, dtype=np.int64) for start, count in runs])
+    vectors = index.reconstruct_batch(ids)
+    distances = ((vectors - query[0]) ** 2).sum(axis=1)  # squared L2, as IndexFlatL2 reports
+    top = np.argsort(distances)[:k]
+    return [(int(ids[i]), float(distances[i])) for i in top]
+
+
+def _search_index(index: faiss.Index, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    distances, rows = index.search(query, min(k, index.ntotal))
+    return [(int(row), float(dist)) for row, dist in zip(rows[0], distances[0]) if row >= 0]
+
+
+def _vectors(index: faiss.Index) -> np.ndarray:
+    blocks = [
+        index.reconstruct_n(start, min(_RECONSTRUCT_BLOCK, index.ntotal - start))
+        for start in range(0, index.ntotal, _RECONSTRUCT_BLOCK)
+    ]
+    return np.vstack(blocks) if blocks else np.zeros((0, index.d), dtype=np.float32)
+
+
+def _min_training_points(index: faiss.Index, min_train_points: int) -> int:
+    """Vectors needed before an untrained index can be trained: at least 39 per IVF list."""
+    if index.is_trained:
+        return 0
+    try:
+        return max(min_train_points, TRAIN_POINTS_PER_CENTROID * faiss.extract_index_ivf(index).nlist)
+    except Exception:
+        return min_train_points  # not IVF (e.g. PQ or SQ8 alone)
+
+
+def build_index(factory: str, vectors: np.ndarray, min_train_points: int = 10_000) -> Tuple[faiss.Index, str]:
+    """
+    Build an L2 index from a faiss factory string ("Flat", "HNSW32", "IVF1024,Flat",
+    "IVF1024,PQ64", "SQfp16", ...), training it on `vectors` when it needs training.
+    Too few vectors to train falls back to Flat. Returns (index, factory actually used).
+    Pre-transform factories ("PCA256,Flat", "OPQ16,IVF1024,PQ16", ...) are rejected.
+    """
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexPreTransform):
+        raise ValueError(f"Index factory {factory!r} transforms vectors; its distances cannot be merged with Flat segments")
+    if len(vectors) < _min_training_points(index, min_train_points):
+        index, factory = faiss.IndexFlatL2(dim), FLAT_FACTORY
+    elif not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()  # scoped searches reconstruct rows by id
+    except Exception:
+        pass  # not IVF: rows can be reconstructed already
+    return index, factory
+
+
+class SegmentedFAISS:
+    """
+    FAISS store persisted as an optional compacted base plus one segment per ingested document.
+
+    Adding a document writes only that document's segment (`seg-<doc_id>.faiss`) and its chunk
+    rows, then atomically replaces `manifest.json`, which is the single commit point: files not
+    listed there are ignored on load, so a crash mid-save leaves the previous store intact.
+    Once `compact_threshold` segments accumulate, a background thread merges base and
+    segments into a new base and retires the old files.
+
+    Index files are memory-mapped read-only and hold vectors only; chunk text and metadata
+    live in `chunks.sqlite` and are fetched for the top-k hits of a search. Which base rows
+    belong to which document is recorded in the manifest as runs, so loading reads no chunks.
+
+    Searches can be scoped to a set of doc_ids: a document still in its segment is searched
+    through that segment alone, and one merged into the base through its own rows only.
+
+    Segments are always exact Flat indexes. The base is built with `index_factory` once the
+    corpus holds enough vectors to train it (Flat until then); a base built with another
+    factory, e.g. an existing flat store, is rebuilt in the background after load.
+
+    The manifest names the embedding model that produced the vectors; loading a store built
+    by another model raises EmbeddingModelMismatch instead of mixing incompatible vectors.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_model: Optional[str] = None,
+        compact_threshold: int = 16,
+        index_factory: str = FLAT_FACTORY,
+        min_train_points: int = 10_000,
+        nprobe: int = 16,
+        ef_search: int = 64,
+    ):
+        if _PRETRANSFORM.match(index_factory):
+            raise ValueError(
+                f"Index factory {index_factory!r} transforms vectors before indexing; search merges base and "
+                "segment distances, so they must be in the same space. Use a factory without a pre-transform."
+            )
+        self.directory = directory
+        self.embedding_model = embedding_model
+        self.compact_threshold = compact_threshold
+        self.index_factory = index_factory
+        self.min_train_points = min_train_points
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._lock = threading.RLock()
+        self._chunks = ChunkStore(os.path.join(directory, CHUNKS_FILE))
+        self._base_name: Optional[str] = None
+        self._base: Optional[faiss.Index] = None
+        self._base_factory = FLAT_FACTORY
+        self._base_runs: List[list] = []  # [doc_id, first_row, count, first_seq], ordered by first_row
+        self._run_starts: List[int] = []
+        self._base_doc_runs: Dict[str, List[Tuple[int, int]]] = {}  # doc_id -> (first_row, count) inside the base
+        self._segments: Dict[str, faiss.Index] = {}  # segment name -> index, in ingest order
+        self._compacting = False
+
+    # ------------------------
+    # Loading / saving
+    # ------------------------
+    def load(self) -> None:
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        elif os.path.exists(self._path(LEGACY_INDEX_NAME)):
+            manifest = {"base": LEGACY_INDEX_NAME, "segments": []}
+        else:
+            manifest = {"version": MANIFEST_VERSION, "base": None, "base_runs": [], "segments": []}
+        if manifest.get("version", 1) < MANIFEST_VERSION:
+            manifest = self._migrate_pickled_docstores(manifest)
+        if manifest.get("base") or manifest.get("segments"):
+            built_with = manifest.get("embedding_model", LEGACY_EMBEDDING_MODEL)
+            if self.embedding_model is None:
+                self.embedding_model = built_with
+            elif built_with != self.embedding_model:
+                raise EmbeddingModelMismatch(
+                    f"{self.directory} was built with embedding model {built_with!r} but {self.embedding_model!r} "
+                    "is configured. Configure the original model, or move the directory away to re-index."
+                )
+
+        with self._lock:
+            self._base_name = manifest.get("base")
+            self._base = self._open_index(self._base_name) if self._base_name else None
+            self._base_factory = manifest.get("base_factory", FLAT_FACTORY)
+            self._set_base_runs(manifest.get("base_runs", []))
+            self._segments = {name: self._open_index(name) for name in manifest.get("segments", [])}
+            rebuild = self._base is not None and self._target_factory() != self._base_factory
+            if rebuild:
+                self._compacting = True
+        if rebuild:
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.faiss")
+
+    def _open_index(self, name: str) -> faiss.Index:
+        global _warned_no_mmap
+        if not _MMAP_IFC and not _warned_no_mmap:
+            _warned_no_mmap = True
+            warnings.warn(
+                f"faiss {faiss.__version__} has no IO_FLAG_MMAP_IFC: Flat indexes are read into memory "
+                "instead of memory-mapped. Upgrade faiss-cpu to map them.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        index = faiss.read_index(self._path(name), _MMAP_FLAGS)
+        try:
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        except Exception:
+            pass
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = self.ef_search
+        return index
+
+    def _target_factory(self) -> str:
+        """Factory the base should use at the current corpus size (caller holds the lock)."""
+        parts = ([self._base] if self._base is not None else []) + list(self._segments.values())
+        if self.index_factory == FLAT_FACTORY or not parts:
+            return FLAT_FACTORY
+        total = sum(part.ntotal for part in parts)
+        probe = faiss.index_factory(parts[0].d, self.index_factory, faiss.METRIC_L2)
+        return self.index_factory if total >= _min_training_points(probe, self.min_train_points) else FLAT_FACTORY
+
+    def _set_base_runs(self, runs: List[list]) -> None:
+        self._base_runs = runs
+        self._run_starts = [run[1] for run in runs]
+        self._base_doc_runs = _runs_by_doc(runs)
+
+    def _migrate_pickled_docstores(self, manifest: dict) -> dict:
+        """
+        One-time upgrade of stores written by FAISS.save_local: the `.faiss` files are kept
+        as they are, the pickled docstores move into the chunk table and are removed.
+        """
+        base_name = manifest.get("base")
+        base_runs: List[list] = []
+        parts = ([base_name] if base_name else []) + list(manifest.get("segments", []))
+        for name in parts:
+            with open(os.path.join(self.directory, f"{name}.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            per_doc: Dict[str, Tuple[List[str], List[dict]]] = {}
+            for row in range(len(index_to_docstore_id)):
+                doc = docstore.search(index_to_docstore_id[row])
+                text = doc.page_content if isinstance(doc, Document) else ""
+                metadata = dict(doc.metadata) if isinstance(doc, Document) else {}
+                if name == base_name:
+                    doc_id = metadata.get("doc_id") or f"{UNTAGGED_PREFIX}{name}"
+                else:
+                    doc_id = _segment_doc_id(name)
+                texts, metadatas = per_doc.setdefault(doc_id, ([], []))
+                if name == base_name:
+                    last = base_runs[-1] if base_runs else None
+                    if last is not None and last[0] == doc_id and last[1] + last[2] == row:
+                        last[2] += 1
+                    else:
+                        base_runs.append([doc_id, row, 1, len(texts)])
+                texts.append(text)
+                metadatas.append(metadata)
+            for doc_id, (texts, metadatas) in per_doc.items():
+                self._chunks.put(doc_id, texts, metadatas)
+
+        migrated = {"version": MANIFEST_VERSION, "embedding_model": LEGACY_EMBEDDING_MODEL, "base": base_name,
+                    "base_factory": FLAT_FACTORY, "base_runs": base_runs,
+                    "segments": list(manifest.get("segments", []))}
+        _write_json_atomic(os.path.join(self.directory, MANIFEST_FILE), migrated)
+        for name in parts:
+            self._remove_files(f"{name}.pkl")
+        return migrated
+
+    def _write_manifest(self) -> None:
+        _write_json_atomic(
+            os.path.join(self.directory, MANIFEST_FILE),
+            {
+                "version": MANIFEST_VERSION,
+                "embedding_model": self.embedding_model,
+                "base": self._base_name,
+                "base_factory": self._base_factory,
+                "base_runs": self._base_runs,
+                "segments": list(self._segments),
+            },
+        )
+
+    def _remove_files(self, *filenames: str) -> None:
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                pass
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._base is None and not self._segments
+
+    def has_document(self, doc_id: str) -> bool:
+        with self._lock:
+            return f"{SEGMENT_PREFIX}{doc_id}" in self._segments or doc_id in self._base_doc_runs
+
+    def add(self, doc_id: str, text_embeddings: List[Tuple[str, List[float]]], metadatas: List[dict]) -> None:
+        """Persist one document as its own segment; cost scales with that document only."""
+        vectors = np.asarray([vector for _, vector in text_embeddings], dtype=np.float32)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        name = f"{SEGMENT_PREFIX}{doc_id}"
+        faiss.write_index(index, self._path(name))
+        self._chunks.put(doc_id, [text for text, _ in text_embeddings], metadatas)
+        segment = self._open_index(name)
+        with self._lock:
+            self._segments[name] = segment
+            self._write_manifest()
+            should_compact = len(self._segments) >= self.compact_threshold and not self._compacting
+            if should_compact:
+                self._compacting = True
+        if should_compact:
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    @property
+    def chunks(self) -> ChunkStore:
+        return self._chunks
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, doc_ids: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Keep the k closest hits (L2 distance, lower is better) across every part,
+        or only across the chunks of `doc_ids` when given.
+        """
+        hits = self.search_keys(embedding, k, doc_ids)
+        documents = dict(zip((key for key, _ in hits), self.documents(key for key, _ in hits)))
+        return [(documents[key], distance) for key, distance in hits if key in documents]
+
+    def search_keys(
+        self, embedding: List[float], k: int = 4, doc_ids: Optional[List[str]] = None
+    ) -> List[Tuple[ChunkKey, float]]:
+        """Like similarity_search_with_score_by_vector, but returns chunk keys without reading text."""
+        query = np.asarray([embedding], dtype=np.float32)
+        hits: List[Tuple[ChunkKey, float]] = []
+        with self._lock:
+            if doc_ids is None:
+                if self._base is not None:
+                    hits.extend((self._base_key(row), d) for row, d in _search_index(self._base, query, k))
+                for name, segment in self._segments.items():
+                    doc_id = _segment_doc_id(name)
+                    hits.extend(((doc_id, row), d) for row, d in _search_index(segment, query, k))
+            else:
+                for doc_id in set(doc_ids):
+                    segment = self._segments.get(f"{SEGMENT_PREFIX}{doc_id}")
+                    if segment is not None:
+                        hits.extend(((doc_id, row), d) for row, d in _search_index(segment, query, k))
+                    elif doc_id in self._base_doc_runs:
+                        rows = _search_rows(self._base, query, k, self._base_doc_runs[doc_id])
+                        hits.extend((self._base_key(row), d) for row, d in rows)
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:k]
+
+    def documents(self, keys) -> List[Document]:
+        """Chunks for the given keys, in order; only these rows are read from disk."""
+        keys = list(keys)
+        found = self._chunks.get_many(keys)
+        return [Document(page_content=found[key][0], metadata=found[key][1]) for key in keys if key in found]
+
+    def _base_key(self, row: int) -> ChunkKey:
+        doc_id, start, _, first_seq = self._base_runs[bisect.bisect_right(self._run_starts, row) - 1]
+        return doc_id, first_seq + row - start
+
+    def compact(self) -> None:
+        """
+        Merge base and current segments into a new base file and drop the merged segments.
+        The base is rebuilt (and trained) only when its factory changes; otherwise the
+        segment vectors are added to a copy of it, so compressed rows are never re-encoded.
+        """
+        with self._lock:
+            old_base_name, base_factory = self._base_name, self._base_factory
+            base, base_runs = self._base, list(self._base_runs)
+            segments = dict(self._segments)
+            factory = self._target_factory()
+            if len(segments) + (base is not None) < 2 and (base is None or factory == base_factory):
+                return
+        # Merging and writing happen outside the lock; searches keep using the old parts
+        if base is not None and factory == base_factory:
+            merged = faiss.read_index(self._path(old_base_name))  # writable copy; the mapped one is read-only
+            for segment in segments.values():
+                merged.add(_vectors(segment))
+        else:
+            parts = ([base] if base is not None else []) + list(segments.values())
+            merged, factory = build_index(factory, np.vstack([_vectors(part) for part in parts]), self.min_train_points)
+        merged_runs = [list(run) for run in base_runs]
+        offset = base.ntotal if base is not None else 0
+        for name, segment in segments.items():
+            merged_runs.append([_segment_doc_id(name), offset, segment.ntotal, 0])
+            offset += segment.ntotal
+        new_base_name = f"base-{int(time.time() * 1000)}"
+        faiss.write_index(merged, self._path(new_base_name))
+        del merged
+        new_base = self._open_index(new_base_name)
+
+        with self._lock:
+            self._base_name, self._base, self._base_factory = new_base_name, new_base, factory
+            self._set_base_runs(merged_runs)
+            for name in segments:
+                self._segments.pop(name, None)
+            self._write_manifest()
+        for name in list(segments) + ([old_base_name] if old_base_name else []):
+            self._remove_files(f"{name}.faiss")
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            pass  # the un-compacted manifest stays valid; retried after the next add
+        finally:
+            with self._lock:
+                self._compacting = False
@@ -0,0 +1,130 @@
+# tools/ttl_cache.py
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe string cache with per-entry TTL:
+    - an in-memory LRU of at most `max_memory_entries` entries
+    - an optional SQLite tier at `path` capped at `max_disk_entries` (least recently used evicted first)
+    """
+
+    _PRUNE_EVERY = 64  # sets between disk prunes
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        table: str = "cache",
+    ):
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._max_memory = max_memory_entries
+        self._max_disk = max_disk_entries
+        self._table = table
+        self._sets_since_prune = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed ON {self._table}(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error:
+            self._conn = None  # disk tier is best-effort; keep serving from memory
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                value, expires_at = hit
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            try:
+                row = self._conn.execute(
+                    f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, expires_at = row
+                if expires_at <= now:
+                    self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                self._conn.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            except sqlite3.Error:
+                return None
+            self._remember(key, value, expires_at)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                self._sets_since_prune += 1
+                if self._sets_since_prune >= self._PRUNE_EVERY:
+                    self._prune(now)
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute(f"DELETE FROM {self._table}")
+                    self._conn.commit()
+                except sqlite3.Error:
+                    pass
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory:
+            self._memory.popitem(last=False)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired rows, then the least recently used ones beyond the disk cap."""
+        self._sets_since_prune = 0
+        self._conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()
+        excess = count - self._max_disk
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self._table} WHERE key IN "
+                f"(SELECT key FROM {self._table} ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
@@ -1,7 +1,98 @@
+import json
+import re
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
 from langchain.tools import Tool
 from ddgs import DDGS
 
-def build_advanced_web_search(memory=None, max_results=3):
+from tools.ttl_cache import TTLCache
+
+# A search backend takes (query, max_results) and returns result dicts with title/href/body.
+# Anything with that shape can stand in for DuckDuckGo, e.g. a local stub in tests.
+SearchBackend = Callable[[str, int], List[Dict[str, str]]]
+
+WEB_SEARCH_TTL = 3600.0  # seconds a cached result list is served
+
+# Reformulations of one tool call are searched concurrently; a query slower than
+# SEARCH_QUERY_TIMEOUT is abandoned (its result still lands in the cache when it arrives)
+SEARCH_QUERY_TIMEOUT = 5.0
+SEARCH_MAX_WORKERS = 8
+QUERY_SEPARATOR = " | "  # the agent may pass several phrasings in one Action Input
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from has have how i in is it its me of on or "
+    "please tell that the this to was were what when where which who why will with you your".split()
+)
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="web-search")
+
+# One long-lived DDGS client per thread: its engines keep their HTTP sessions open between
+# searches, and threads never share a client.
+_sessions = threading.local()
+
+
+def ddgs_backend(query: str, max_results: int) -> List[Dict[str, str]]:
+    session = getattr(_sessions, "ddgs", None)
+    if session is None:
+        session = _sessions.ddgs = DDGS()
+    try:
+        return session.text(query, max_results=max_results)
+    except Exception:
+        _sessions.ddgs = None  # start a fresh session next time
+        raise
+
+
+def _normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def _keywords(query: str) -> List[str]:
+    words = re.findall(r"[\w.+#-]+", query.lower())
+    return [w for w in words if w not in _STOPWORDS] or words
+
+
+def _reformulations(query: str, history_context: str) -> List[str]:
+    """Distinct queries to run for one tool call: each phrasing given, with history, keyword-only."""
+    queries = []
+    for phrasing in (q.strip() for q in query.split(QUERY_SEPARATOR.strip())):
+        if not phrasing:
+            continue
+        queries.append(phrasing)
+        if history_context:
+            queries.append(f"{history_context} {phrasing}")
+        queries.append(" ".join(_keywords(phrasing)))
+    unique = {}
+    for q in queries:
+        unique.setdefault(_normalize_query(q), q)
+    return [q for key, q in unique.items() if key]
+
+
+def build_advanced_web_search(
+    memory=None,
+    max_results=3,
+    search_backend: Optional[SearchBackend] = None,
+    cache: Optional[TTLCache] = None,
+    cache_ttl: float = WEB_SEARCH_TTL,
+):
+    """
+    search_backend defaults to DuckDuckGo (ddgs_backend). Raw backend results are cached in
+    `cache` (an in-memory TTLCache unless one is given) by normalized full query and result count;
+    failed searches are not cached.
+    """
+    search_backend = search_backend or ddgs_backend
+    cache = cache if cache is not None else TTLCache(max_memory_entries=256)
+
+    def cached_search(full_query: str, count: int) -> List[Dict[str, str]]:
+        key = f"{count}:{_normalize_query(full_query)}"
+        hit = cache.get(key)
+        if hit is not None:
+            return json.loads(hit)
+        results = list(search_backend(full_query, count))
+        cache.set(key, json.dumps(results), cache_ttl)
+        return results
+
     def advanced_web_search(query: str) -> str:
         """
         Performs an advanced web search using DuckDuckGo with context from chat history.
@@ -25,27 +116,40 @@ def build_advanced_web_search(memory=None, max_results=3):
                     else:
                         history_context = mem_vars["chat_history"]
 
-            # Combine history and query
-            full_query = f"{history_context} {query}".strip()
+            queries = _reformulations(query, history_context)
+            keywords = set(_keywords(query.replace(QUERY_SEPARATOR.strip(), " ")))
 
-            output_lines = []
-            query_keywords = set(query.lower().split())
-
-            # Fetch fewer results for speed
-            with DDGS() as ddgs:
-                for result in ddgs.text(full_query, max_results=max_results * 2):  
-                    body_text = result.get("body", "").lower()
-                    # Fast relevance check
-                    if any(word in body_text for word in query_keywords):
+            # Fan the reformulations out at once; stop as soon as enough relevant results are in
+            output_lines, seen_urls, errors = [], set(), []
+            pending = {_search_pool.submit(cached_search, q, max_results * 2) for q in queries}
+            deadline = time.monotonic() + SEARCH_QUERY_TIMEOUT
+            while pending and len(output_lines) < max_results:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # every remaining query ran past its timeout
+                for future in done:
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    for result in results:
+                        if len(output_lines) >= max_results:
+                            break
+                        url = result.get("href", "")
+                        body_text = result.get("body", "").lower()
+                        # Fast relevance check, one entry per URL across all queries
+                        if url in seen_urls or not any(word in body_text for word in keywords):
+                            continue
+                        seen_urls.add(url)
                         output_lines.append(
                             f"{result.get('title','No Title')}\n"
-                            f"{result.get('href','')}\n"
+                            f"{url}\n"
                             f"{result.get('body','')}\n"
                         )
-                        # Stop early if enough results
-                        if len(output_lines) >= max_results:
-                            break
 
+            if not output_lines and errors and len(errors) == len(queries):
+                return f"Search failed: {str(errors[0])}"
             return "\n".join(output_lines) if output_lines else "No relevant results found."
 
         except Exception as e:
@@ -54,5 +158,8 @@ def build_advanced_web_search(memory=None, max_results=3):
     return Tool.from_function(
         func=advanced_web_search,
         name="WebSearchTool",
-        description="Searches the web using DuckDuckGo with context from recent chat history to improve relevance."
+        description=(
+            "Searches the web using DuckDuckGo with context from recent chat history to improve relevance. "
+            f"Several phrasings of the same question can be given at once, separated by '{QUERY_SEPARATOR}'."
+        ),
     )